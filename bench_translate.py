@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Translator Benchmarks
+Runs gemini_translate.py end to end against a local mock_gemini.py server and reports throughput,
+so changes to batching and concurrency can be measured without network access or API quota.
+"""
+"""
+ python bench_translate.py translate --source web/src/locales/en.json --keys 4 --latency 0.5 -- --concurrency 8
+ python bench_translate.py flatten
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import argparse
+
+from mock_gemini import MockGemini, make_server
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TRANSLATOR = os.path.join(ROOT, "gemini_translate.py")
+
+
+def count_strings(path):
+    from gemini_translate import flatten_dict, load_json
+
+    return sum(1 for v in flatten_dict(load_json(path)).values() if isinstance(v, str) and v.strip() != "")
+
+
+def run_translate_once(args, translator_args):
+    mock = MockGemini(
+        latency=args.latency,
+        jitter=args.jitter,
+        rpm=args.server_rpm,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        truncate_rate=args.truncate_rate,
+        drop_rate=args.drop_rate,
+        max_output_chars=args.max_output_chars,
+        seed=args.seed,
+    )
+    server = make_server(mock)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # Fresh copies every run so nothing (targets, manifests, memory) carries over between runs
+            sources = []
+            for i, source in enumerate(args.source):
+                source_dir = os.path.join(workdir, str(i))
+                os.makedirs(source_dir)
+                sources.append(shutil.copy(source, source_dir))
+
+            # Only mock keys: never let a real key from the environment reach the translator
+            env = {k: v for k, v in os.environ.items() if not ("GEMINI" in k and "API_KEY" in k)}
+            env.update({f"GEMINI_API_KEY_{i}": f"mock-key-{i}" for i in range(args.keys)})
+            env["GEMINI_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+
+            cmd = [
+                sys.executable, TRANSLATOR,
+                "--source", *sources,
+                "--lang", f"{args.lang}=out.json",
+                "--memory", os.path.join(workdir, "memory.sqlite"),
+            ]
+            if "--rpm" not in translator_args:
+                cmd += ["--rpm", str(args.rpm)]
+            cmd += translator_args
+
+            start = time.perf_counter()
+            result = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+            wall = time.perf_counter() - start
+
+            if result.returncode != 0:
+                print(result.stdout[-2000:])
+                print(result.stderr[-2000:])
+
+            total = sum(count_strings(s) for s in sources)
+            translated = sum(count_strings(os.path.join(os.path.dirname(s), "out.json")) for s in sources)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with mock.lock:
+        stats = dict(mock.stats)
+    return {
+        "exit_code": result.returncode,
+        "strings": total,
+        "translated": translated,
+        "wall_s": round(wall, 3),
+        "strings_per_s": round(translated / wall, 1) if wall else 0.0,
+        "requests": stats["requests"],
+        "rate_limited": stats["rate_limited"],
+        "truncated": stats["truncated"],
+        "prompt_bytes": stats["prompt_bytes"],
+        "response_bytes": stats["response_bytes"],
+    }
+
+
+def bench_translate(args, translator_args):
+    runs = []
+    for i in range(args.repeat):
+        run = run_translate_once(args, translator_args)
+        runs.append(run)
+        if args.json:
+            print(json.dumps(run))
+        else:
+            print(
+                f"run {i + 1}: {run['translated']}/{run['strings']} strings in {run['wall_s']:.2f}s "
+                f"({run['strings_per_s']:.1f} strings/s), {run['requests']} requests "
+                f"({run['rate_limited']} rate-limited, {run['truncated']} truncated), "
+                f"{run['prompt_bytes']:,} prompt bytes, {run['response_bytes']:,} response bytes"
+                + (f", exit code {run['exit_code']}" if run["exit_code"] else "")
+            )
+
+    if len(runs) > 1 and not args.json:
+        walls = [r["wall_s"] for r in runs]
+        print(f"median wall time {statistics.median(walls):.2f}s (min {min(walls):.2f}s, max {max(walls):.2f}s)")
+
+
+def legacy_flatten_dict(d, parent_key='', sep='|'):
+    # The recursive flatten gemini_translate.py used to ship, kept as the baseline for the micro-benchmark
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else str(k)
+        if isinstance(v, dict):
+            items.extend(legacy_flatten_dict(v, new_key, sep=sep).items())
+        elif isinstance(v, list):
+            for i, item in enumerate(v):
+                items.extend(legacy_flatten_dict({str(i): item}, new_key, sep=sep).items())
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+def legacy_nest_flat_dict(flat_dict, sep='|'):
+    result = {}
+    for k, v in flat_dict.items():
+        parts = k.split(sep)
+        d = result
+        for part in parts[:-1]:
+            d = d.setdefault(part, {})
+        d[parts[-1]] = v
+    return result
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_flatten(args):
+    from gemini_translate import flatten_dict, iter_flat, nest_flat_dict, load_json
+
+    for path in args.files:
+        data = load_json(path)
+        flat = flatten_dict(data)
+        assert flat == legacy_flatten_dict(data), f"flatten output differs from the legacy one for {path}"
+        assert nest_flat_dict(flat) == data, f"{path} doesn't round-trip"
+
+        cases = [
+            ("flatten (legacy)", lambda: legacy_flatten_dict(data)),
+            ("flatten", lambda: flatten_dict(data)),
+            ("iter_flat (lazy)", lambda: sum(1 for _ in iter_flat(data))),
+            ("nest (legacy)", lambda: legacy_nest_flat_dict(flat)),
+            ("nest", lambda: nest_flat_dict(flat)),
+        ]
+        print(f"{path}: {os.path.getsize(path):,} bytes, {len(flat):,} leaves")
+        for name, fn in cases:
+            best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / args.number
+            print(f"  {name:<18} {best * 1000:8.2f} ms   peak {peak_kib(fn):8.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks for the locale translator tooling",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Arguments after "--" are passed straight to gemini_translate.py, e.g.:
+  python bench_translate.py translate --keys 4 --latency 0.5 -- --concurrency 8 --token-budget 4000
+        ''',
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    translate = subparsers.add_parser("translate", help="Run the translator end to end against the mock Gemini server")
+    translate.add_argument("--source", nargs="+", default=[os.path.join(ROOT, "web/src/locales/en.json")], help="Source locale file(s) to translate")
+    translate.add_argument("--lang", default="Arabic", help="Language to translate into")
+    translate.add_argument("--keys", type=int, default=1, help="Number of mock API keys to give the translator")
+    translate.add_argument("--rpm", type=float, default=0, help="Translator --rpm per key (default: unlimited)")
+    translate.add_argument("--repeat", type=int, default=1, help="Number of runs")
+    translate.add_argument("--json", action="store_true", help="Print one JSON object per run instead of a summary line")
+    translate.add_argument("--latency", type=float, default=0.2, help="Mock server latency per request in seconds")
+    translate.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    translate.add_argument("--server-rpm", type=int, default=0, help="Requests per minute the mock allows per key before answering 429")
+    translate.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a spurious 429")
+    translate.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds the mock sends with 429s")
+    translate.add_argument("--truncate-rate", type=float, default=0.0, help="Probability of a truncated JSON response")
+    translate.add_argument("--max-output-chars", type=int, default=0, help="Truncate responses longer than this (0 = never)")
+    translate.add_argument("--drop-rate", type=float, default=0.0, help="Probability of the mock leaving out each string")
+    translate.add_argument("--seed", type=int, default=1, help="Random seed for the mock's simulated failures")
+
+    flatten = subparsers.add_parser("flatten", help="Micro-benchmark the flatten/nest engine on the locale files")
+    flatten.add_argument("--files", nargs="+", default=[os.path.join(ROOT, "web/src/locales", f"{code}.json") for code in ("en", "ar", "fr")], help="Locale files to benchmark on")
+    flatten.add_argument("--number", type=int, default=20, help="Calls per timing sample")
+    flatten.add_argument("--repeat", type=int, default=5, help="Timing samples; the best one is reported")
+
+    argv = sys.argv[1:]
+    translator_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, translator_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    if args.command == "translate":
+        bench_translate(args, translator_args)
+    elif args.command == "flatten":
+        bench_flatten(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,38 +2,80 @@ import json
 import time
 import os
 import requests
-import os
-import requests
 import argparse
 import re
+import hashlib
+import email.utils
+import sqlite3
+import threading
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 
-def flatten_dict(d, parent_key='', sep='|'):
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else str(k)
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            for i, item in enumerate(v):
-                items.extend(flatten_dict({str(i): item}, new_key, sep=sep).items())
+try:
+    # Optional: native file-change events for --watch; falls back to polling mtimes without it
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+def iter_flat(d, sep='|', parent_key=''):
+    # Yields (path, value) for every leaf in document order. Walks with an explicit stack of
+    # iterators, so nothing is copied per level and huge trees can be streamed lazily.
+    stack = [(iter(d.items()), parent_key)]
+    while stack:
+        items, prefix = stack[-1]
+        for k, v in items:
+            new_key = f"{prefix}{sep}{k}" if prefix else str(k)
+            if isinstance(v, dict):
+                stack.append((iter(v.items()), new_key))
+                break
+            elif isinstance(v, list):
+                stack.append((((str(i), item) for i, item in enumerate(v)), new_key))
+                break
+            yield new_key, v
         else:
-            if isinstance(v, str) and v.strip() != "":
-                items.append((new_key, v))
-            else:
-                items.append((new_key, v))
-    return dict(items)
+            stack.pop()
 
-def nest_flat_dict(flat_dict, sep='|'):
+def flatten_dict(d, parent_key='', sep='|'):
+    return dict(iter_flat(d, sep, parent_key))
+
+def nest_flat_dict(flat_dict, sep='|', lists=True):
     result = {}
+    created = []
+    last_parent, last_container = None, result
     for k, v in flat_dict.items():
-        parts = k.split(sep)
-        d = result
-        for part in parts[:-1]:
-            d = d.setdefault(part, {})
-        d[parts[-1]] = v
+        parent, _, leaf = k.rpartition(sep)
+        # Keys arrive grouped by parent, so most of the time the container is the one used last
+        if parent != last_parent:
+            d = result
+            if parent:
+                for part in parent.split(sep):
+                    child = d.get(part)
+                    if not isinstance(child, dict):
+                        child = d[part] = {}
+                        created.append((d, part, child))
+                    d = child
+            last_parent, last_container = parent, d
+        last_container[leaf] = v
+
+    if lists:
+        # flatten_dict turns lists into "0", "1", ... keys; turn those containers back into lists.
+        # Children were created after their parents, so walking backwards converts them first.
+        for parent_dict, part, child in reversed(created):
+            if child and all(key == str(i) for i, key in enumerate(child)):
+                parent_dict[part] = list(child.values())
     return result
 
+def ordered_flat(progress_flat, base_keys, source_keys):
+    # Keys that were already in the target keep their place and new translations follow
+    # in source order, so the output doesn't depend on which batch finished first.
+    ordered = {k: progress_flat[k] for k in base_keys if k in progress_flat}
+    for k in source_keys:
+        if k in progress_flat and k not in ordered:
+            ordered[k] = progress_flat[k]
+    return ordered
+
 def load_json(path):
     if not os.path.exists(path):
         return {}
@@ -44,16 +86,178 @@ def load_json(path):
             return {}
 
 def save_json(path, data):
-    with open(path, 'w', encoding='utf-8') as f:
+    # Write to a temp file and rename over the target so a crash never leaves it truncated
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
 
-def translate_batch_with_gemini(api_key, batch_dict_flat, language):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
-    
-    # We nest the flat dictionary to give Gemini proper contextual nested JSON!
-    nested_batch = nest_flat_dict(batch_dict_flat)
+def source_hash(text):
+    return hashlib.sha256(unicodedata.normalize("NFC", text).encode('utf-8')).hexdigest()
+
+def sidecar_path(target_file, kind):
+    directory, name = os.path.split(target_file)
+    return os.path.join(directory, f".{os.path.splitext(name)[0]}.{kind}")
+
+def unchanged_hash(h):
+    # Manifest entry for a string confirmed to read the same in the target language as in English
+    return f"={h}"
+
+def manifest_path(target_file):
+    # Sidecar next to the target recording which English text each translation was made from
+    return sidecar_path(target_file, "manifest.json")
+
+def journal_path(target_file):
+    # Append-only log of batch results that haven't been folded into the target file yet
+    return sidecar_path(target_file, "journal.jsonl")
+
+class TranslationMemory:
+    """On-disk cache of translations keyed by (source text hash, target language), shared across runs and files."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "source_hash TEXT NOT NULL, language TEXT NOT NULL, source TEXT NOT NULL, translation TEXT NOT NULL, "
+            "PRIMARY KEY (source_hash, language))"
+        )
+        # Strings confirmed to read the same in a language (names, "{{count}} clients" in French...), so they aren't re-sent
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS unchanged ("
+            "source_hash TEXT NOT NULL, language TEXT NOT NULL, source TEXT NOT NULL, "
+            "PRIMARY KEY (source_hash, language))"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _language(language):
+        return language.strip().lower()
+
+    def lookup(self, texts, language):
+        found = {}
+        hashes = {source_hash(t): t for t in texts}
+        hash_list = list(hashes)
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(hash_list), 500):
+            chunk = hash_list[i:i+500]
+            rows = self.conn.execute(
+                f"SELECT source_hash, translation FROM translations WHERE language = ? AND source_hash IN ({','.join('?' * len(chunk))})",
+                [self._language(language), *chunk],
+            )
+            for h, translation in rows:
+                # Entries that just echo the English (written before store() refused them) don't count as hits
+                if translation.strip() != hashes[h].strip():
+                    found[hashes[h]] = translation
+            rows = self.conn.execute(
+                f"SELECT source_hash FROM unchanged WHERE language = ? AND source_hash IN ({','.join('?' * len(chunk))})",
+                [self._language(language), *chunk],
+            )
+            for (h,) in rows:
+                found[hashes[h]] = hashes[h]
+        return found
+
+    def store(self, pairs, language, overwrite=True):
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        self.conn.executemany(
+            f"{verb} INTO translations (source_hash, language, source, translation) VALUES (?, ?, ?, ?)",
+            # An unchanged string is never remembered, so an echoed English answer can't be served again later
+            [(source_hash(src), self._language(language), src, dst) for src, dst in pairs if dst.strip() != src.strip()],
+        )
+        if overwrite:
+            self.conn.executemany(
+                "DELETE FROM unchanged WHERE source_hash = ? AND language = ?",
+                [(source_hash(src), self._language(language)) for src, dst in pairs if dst.strip() != src.strip()],
+            )
+        self.conn.commit()
+
+    def store_unchanged(self, texts, language):
+        rows = [(source_hash(text), self._language(language), text) for text in texts]
+        self.conn.executemany("INSERT OR REPLACE INTO unchanged (source_hash, language, source) VALUES (?, ?, ?)", rows)
+        self.conn.executemany("DELETE FROM translations WHERE source_hash = ? AND language = ?", [row[:2] for row in rows])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class GeminiError(Exception):
+    """A request to Gemini failed."""
+
+class RateLimitError(GeminiError):
+    """Gemini answered 429; `retry_after` is the suggested wait in seconds, when it gave one."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
-    prompt = f"""You are a professional translator for a gym management software. Translate the following JSON values from English to {language}. 
+class TransportError(GeminiError):
+    """Gemini couldn't be reached at all (connection error, timeout), which says nothing about the key."""
+
+class KeyRejectedError(GeminiError):
+    """The API key itself was refused (invalid, revoked or without access)."""
+
+class MalformedResponseError(GeminiError):
+    """Gemini answered, but the JSON was truncated or couldn't be parsed; `partial` holds whatever could be salvaged."""
+
+    def __init__(self, message, partial=None):
+        super().__init__(message)
+        self.partial = partial or {}
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([^{}]*?)\s*\}\}")
+
+# Two to four capitalized words, initials included: people, gyms and programs ("Marcus Chen", "Mark S.", "Iron Gate Athletics")
+NAME_LIKE_RE = re.compile(r"[A-Z][\w'-]*\.?(?:\s+[A-Z][\w'-]*\.?){1,3}")
+
+def validate_translation(source, value, confirm=False):
+    # Returns why a translation can't be used, or None if it is fine
+    if not isinstance(value, str) or not value.strip():
+        return "missing or empty"
+    if sorted(PLACEHOLDER_RE.findall(source)) != sorted(PLACEHOLDER_RE.findall(value)):
+        return "placeholders changed"
+    if value.strip() == source.strip() and re.search(r"[^\W\d_]", PLACEHOLDER_RE.sub("", source)):
+        # Names may stay as they are; anything else only once it has come back unchanged again when sent on its own
+        if not (confirm or NAME_LIKE_RE.fullmatch(source.strip())):
+            return "left untranslated"
+    return None
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token; only used to size batches, so it doesn't need to be exact
+    return len(text) // 4 + 1
+
+def item_tokens(key, text, wire="compact"):
+    # An id (or, in the nested format, the key) travels with the value, plus a few tokens of JSON punctuation
+    if wire == "nested":
+        return estimate_tokens(key) + estimate_tokens(text) + 4
+    return estimate_tokens(text) + 4
+
+class TokenBudget:
+    """Per-batch token budget that shrinks after broken responses and grows back after clean ones."""
+
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.current = min(max(initial, self.minimum), self.maximum)
+
+    def shrink(self):
+        self.current = max(self.minimum, int(self.current * 0.5))
+
+    def grow(self):
+        self.current = min(self.maximum, int(self.current * 1.1) + 1)
+
+def batch_context(keys, sep='|'):
+    # Name the part of the app the strings come from, without spelling out every key path
+    sections = list(dict.fromkeys(k.split(sep, 1)[0] for k in keys))
+    if len(sections) == 1:
+        common = os.path.commonprefix([k.split(sep)[:-1] for k in keys])
+        sections = [".".join(common) or sections[0]]
+    return ", ".join(sections)
+
+def build_prompt(batch_dict_flat, language, wire="compact"):
+    keys = list(batch_dict_flat)
+
+    if wire == "nested":
+        # We nest the flat dictionary to give Gemini proper contextual nested JSON!
+        nested_batch = nest_flat_dict(batch_dict_flat)
+        return f"""You are a professional translator for a gym management software. Translate the following JSON values from English to {language}. 
 IMPORTANT: 
 - Return ONLY valid JSON and nothing else. Do not use markdown blocks like ```json. 
 - Keep the exact identical nested structure and keys.
@@ -63,6 +267,73 @@ JSON to translate:
 {json.dumps(nested_batch, ensure_ascii=False, indent=2)}
 """
 
+    # Short numeric ids instead of key paths: far fewer tokens each way, and mapped back locally
+    compact_batch = {str(i): batch_dict_flat[k] for i, k in enumerate(keys, 1)}
+    return f"""You are a professional translator for a gym management software. Translate the following JSON values from English to {language}.
+IMPORTANT:
+- Return ONLY valid JSON and nothing else. Do not use markdown blocks like ```json.
+- Keep the exact same ids as keys and translate only the values.
+- Don't translate placeholders like {{{{something}}}}.
+Context: UI strings from the {batch_context(keys)} section(s) of the app.
+
+JSON to translate:
+{json.dumps(compact_batch, ensure_ascii=False, separators=(',', ':'))}
+"""
+
+def decode_response(translated, batch_dict_flat, wire="compact"):
+    if not isinstance(translated, dict):
+        raise MalformedResponseError("Gemini response is not a JSON object")
+    if wire == "nested":
+        return flatten_dict(translated)
+
+    keys = list(batch_dict_flat)
+    decoded = {}
+    for id_, value in translated.items():
+        if str(id_).isdigit() and 1 <= int(id_) <= len(keys):
+            decoded[keys[int(id_) - 1]] = value
+    return decoded
+
+def parse_retry_after(response):
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    # Gemini usually puts the delay in the error body as google.rpc.RetryInfo, e.g. "retryDelay": "34s"
+    try:
+        details = response.json()["error"].get("details", [])
+    except Exception:
+        return None
+    for detail in details:
+        delay = str(detail.get("retryDelay", ""))
+        if delay.endswith("s"):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                pass
+    return None
+
+def salvage_compact(text, batch_dict_flat):
+    # Pull every complete "id": "value" pair out of a cut-off or otherwise broken compact response
+    salvaged = {}
+    for id_, raw in re.findall(r'"(\d+)"\s*:\s*"((?:\\.|[^"\\])*)"', text):
+        try:
+            salvaged[id_] = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            continue
+    return decode_response(salvaged, batch_dict_flat)
+
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com"
+
+def translate_batch_with_gemini(api_key, batch_dict_flat, language, wire="compact", api_base=DEFAULT_API_BASE):
+    url = f"{api_base.rstrip('/')}/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
+    prompt = build_prompt(batch_dict_flat, language, wire)
+
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {
@@ -75,136 +346,801 @@ JSON to translate:
     
     try:
         response = requests.post(url, json=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 429:
-            print("[!] Rate limit exceeded (429).")
-            return None
-        elif response.status_code != 200:
-            print(f"[!] API Error {response.status_code}: {response.text}")
+    except requests.RequestException as e:
+        raise TransportError(f"Exception during API call: {e}")
+
+    if response.status_code == 429:
+        raise RateLimitError("Rate limit exceeded (429).", parse_retry_after(response))
+    elif response.status_code in (401, 403) or (response.status_code == 400 and "API_KEY_INVALID" in response.text):
+        raise KeyRejectedError(f"API key rejected ({response.status_code}): {response.text}")
+    elif response.status_code != 200:
+        raise GeminiError(f"API Error {response.status_code}: {response.text}")
+
+    try:
+        candidate = response.json()["candidates"][0]
+        truncated = candidate.get("finishReason") == "MAX_TOKENS"
+        parts = candidate.get("content", {}).get("parts") or [{}]
+        translated_text = parts[0].get("text", "")
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise GeminiError(f"Unexpected response shape: {e}")
+
+    partial = salvage_compact(translated_text, batch_dict_flat) if wire == "compact" else {}
+    if truncated:
+        raise MalformedResponseError("Gemini response was truncated (MAX_TOKENS)", partial)
+    try:
+        translated = json.loads(translated_text.strip())
+    except json.JSONDecodeError:
+        raise MalformedResponseError("Failed to parse Gemini response as JSON", partial)
+
+    translated_dict_flat = decode_response(translated, batch_dict_flat, wire)
+    if not translated_dict_flat:
+        raise MalformedResponseError("Gemini response contained none of the requested strings")
+    return translated_dict_flat
+
+class KeyState:
+    def __init__(self, index, key):
+        self.index = index
+        self.key = key
+        self.next_at = 0.0
+        self.in_flight = 0
+        self.failures = 0
+        self.rate_limits = 0
+        self.outages = 0
+        self.dead = False
+        self.rejected = False
+
+class KeyPool:
+    """Hands out API keys to concurrent requests, respecting each key's rate limit, cooldowns and health."""
+
+    def __init__(self, api_keys, rpm, start_idx=0, max_failures=3, base_cooldown=2.0, max_cooldown=300.0):
+        self.keys = [KeyState(i, key) for i, key in enumerate(api_keys)]
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.start_idx = start_idx
+        self.max_failures = max_failures
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        # Blocks until some key may send a request; returns None once every key is dead
+        with self.cond:
+            while True:
+                alive = [k for k in self.keys if not k.dead]
+                if not alive:
+                    return None
+
+                now = time.monotonic()
+                state = min(
+                    alive,
+                    key=lambda k: (max(k.next_at, now), k.in_flight, (k.index - self.start_idx) % len(self.keys)),
+                )
+                if state.next_at > now:
+                    # A release or a cooldown change can make another key usable sooner
+                    self.cond.wait(state.next_at - now)
+                    continue
+
+                state.next_at = now + self.interval
+                state.in_flight += 1
+                return state
+
+    def _backoff(self, attempt):
+        return min(self.max_cooldown, self.base_cooldown * 2 ** max(0, attempt - 1))
+
+    def report_success(self, state):
+        with self.cond:
+            state.in_flight -= 1
+            state.failures = 0
+            state.rate_limits = 0
+            state.outages = 0
+            self.cond.notify_all()
+
+    def report_rate_limited(self, state, retry_after=None):
+        with self.cond:
+            state.in_flight -= 1
+            state.rate_limits += 1
+            cooldown = retry_after if retry_after is not None else self._backoff(state.rate_limits)
+            state.next_at = max(state.next_at, time.monotonic() + cooldown)
+            print(f"[!] API Key Index [{state.index}] cooling down for {cooldown:.0f}s.")
+            self.cond.notify_all()
+
+    def report_unreachable(self, state):
+        # The network is down or Gemini is unreachable: back off, but don't hold it against the key
+        with self.cond:
+            state.in_flight -= 1
+            state.outages += 1
+            state.next_at = max(state.next_at, time.monotonic() + self._backoff(state.outages))
+            self.cond.notify_all()
+
+    def report_error(self, state, fatal=False):
+        with self.cond:
+            state.in_flight -= 1
+            state.failures += 1
+            state.rejected = state.rejected or fatal
+            if fatal or state.failures >= self.max_failures:
+                if not state.dead:
+                    print(f"[!] API Key Index [{state.index}] is unusable or failing repeatedly; taking it out of rotation.")
+                state.dead = True
+            else:
+                state.next_at = max(state.next_at, time.monotonic() + self._backoff(state.failures))
+            self.cond.notify_all()
+
+    def revive(self):
+        # Keys that only failed repeatedly get another chance (e.g. before each watch pass); rejected keys stay out
+        with self.cond:
+            for state in self.keys:
+                if state.dead and not state.rejected:
+                    state.dead = False
+                    state.failures = 0
+            self.cond.notify_all()
+
+def run_batch(batch_dict_flat, language, key_pool, max_attempts, wire="compact", api_base=DEFAULT_API_BASE):
+    for _ in range(max_attempts):
+        state = key_pool.acquire()
+        if state is None:
             return None
-            
-        result = response.json()
-        translated_text = result["candidates"][0]["content"]["parts"][0]["text"]
-        
+        print(f"\nTranslating next {len(batch_dict_flat)} items using API Key Index [{state.index}]...")
+
         try:
-            translated_nested = json.loads(translated_text.strip())
-            return flatten_dict(translated_nested)
-        except json.JSONDecodeError:
-            print("[!] Failed to parse Gemini response as JSON")
-            return None
-            
-    except Exception as e:
-        print(f"[!] Exception during API call: {e}")
-        return None
+            translated_dict_flat = translate_batch_with_gemini(state.key, batch_dict_flat, language, wire, api_base)
+        except MalformedResponseError:
+            # A malformed answer is about the batch, not the key, so it goes straight back to the caller
+            key_pool.report_success(state)
+            raise
+        except RateLimitError as e:
+            print(f"[!] {e}")
+            key_pool.report_rate_limited(state, e.retry_after)
+        except KeyRejectedError as e:
+            print(f"[!] {e}")
+            key_pool.report_error(state, fatal=True)
+        except TransportError as e:
+            print(f"[!] {e}")
+            key_pool.report_unreachable(state)
+        except GeminiError as e:
+            print(f"[!] {e}")
+            key_pool.report_error(state)
+        else:
+            key_pool.report_success(state)
+            return translated_dict_flat
 
-def main():
-    parser = argparse.ArgumentParser(description="Translate JSON using Gemini API")
-    parser.add_argument("--source", type=str, required=True, help="Path to the source JSON file (e.g. en.json)")
-    parser.add_argument("--target", type=str, required=True, help="Path to the output JSON file (e.g. ar.json)")
-    parser.add_argument("--lang", type=str, required=True, help="Target language (e.g. 'French', 'Arabic')")
-    parser.add_argument("--start", type=int, default=0, help="Line/Item index to start from (skip the first N string values)")
-    parser.add_argument("--batch-size", type=int, default=40, help="Number of strings to send to Gemini per batch")
-    parser.add_argument("--key-index", type=int, default=0, help="Index of the API key to start with from the .env file")
-    args = parser.parse_args()
+        print("-> Batch Failed. Trying the next available API key.")
 
-    # Load environment variables
-    load_dotenv(".env")
-    load_dotenv("backend/.env")
+    return None
 
-    # Find API keys
-    API_KEYS = [value.strip() for key, value in os.environ.items() if "GEMINI" in key and "API_KEY" in key]
-    if not API_KEYS:
-        print("Warning: No Gemini API keys found in .env! (Defaulting to YOUR_API_KEY_1)")
-        API_KEYS = ["YOUR_API_KEY_1"]
+class TranslationJob:
+    """One source file translated into one language, along with everything known about its progress."""
+
+    def __init__(self, source_file, en_flat, flat_keys, hashes, target_file, language, save_interval=0):
+        self.source_file = source_file
+        self.en_flat = en_flat
+        self.flat_keys = flat_keys
+        self.hashes = hashes
+        self.target_file = target_file
+        self.language = language
+
+        # Load what is ONLY in the target_file right now
+        self.progress_flat = flatten_dict(load_json(target_file))
+        self.base_keys = list(self.progress_flat)
+        self.source_keys = list(en_flat)
+
+        self.manifest_file = manifest_path(target_file)
+        self.manifest = load_json(self.manifest_file)
+        self.keys_needed = []
+        self.stale_keys = set()
+        self.incremental = False
+
+        self.journal_file = journal_path(target_file)
+        self.journal = None
+        self.pending = []
+        self.save_interval = save_interval
+        self.checkpoints_since_save = 0
+        self.replay_journal()
+
+    def replay_journal(self):
+        # Pick up batches that finished after the last full save (e.g. the previous run crashed)
+        if not os.path.exists(self.journal_file):
+            return
+
+        replayed = 0
+        good_bytes = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Only the last line can be cut short by a crash
+                    break
+                self.progress_flat[entry["k"]] = entry["v"]
+                self.manifest[entry["k"]] = entry["h"]
+                replayed += 1
+                good_bytes += len(line)
 
-    source_file = args.source
-    target_file = args.target
-    BATCH_SIZE = args.batch_size
+        # Drop a partial last line so the next append starts on a fresh line instead of being glued onto it
+        if good_bytes < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(good_bytes)
 
+        if replayed:
+            print(f"Replayed {replayed} journaled strings into {self.target_file}.")
+            self.checkpoints_since_save += 1
+
+    def plan(self, incremental):
+        en_flat, progress_flat, manifest = self.en_flat, self.progress_flat, self.manifest
+        self.incremental = incremental
+
+        # Determine what still needs translation, in a single pass:
+        # If the key isn't in ar.json, it hasn't been processed yet.
+        # OR if the text in ar.json exactly matches the English text in en.json
+        # OR (incremental) if the English text changed since the translation was made
+        translated_count = 0
+        adopted_count = 0
+        for k in self.flat_keys:
+            if self.confirmed_unchanged(k):
+                translated_count += 1
+            elif k not in progress_flat or progress_flat[k] == en_flat[k]:
+                self.keys_needed.append(k)
+            elif k in manifest and manifest[k] != self.hashes[k]:
+                self.stale_keys.add(k)
+                if incremental:
+                    self.keys_needed.append(k)
+                else:
+                    translated_count += 1
+            else:
+                # Translations made before the manifest existed are assumed to be up to date
+                if k not in manifest:
+                    manifest[k] = self.hashes[k]
+                    adopted_count += 1
+                translated_count += 1
+
+        if adopted_count:
+            save_json(self.manifest_file, manifest)
+
+        print(f"Detected {translated_count} already translated strings from the current pool in {self.target_file}.")
+        if self.stale_keys:
+            if incremental:
+                print(f"Detected {len(self.stale_keys)} strings whose English text changed since they were translated.")
+            else:
+                print(f"[!] {len(self.stale_keys)} translations in {self.target_file} are out of date with the English text. Run with --incremental to refresh them.")
+
+        print(f"Translating the remaining {len(self.keys_needed)} strings of {self.target_file} incrementally.")
+
+    def confirmed_unchanged(self, k):
+        return self.progress_flat.get(k) == self.en_flat[k] and self.manifest.get(k) == unchanged_hash(self.hashes[k])
+
+    def update_source(self, en_flat, flat_keys, hashes):
+        # Watch mode: queue strings that are new, still untranslated, or whose translation the manifest says was
+        # made from other English text, so an edit whose retranslation failed in an earlier pass is retried.
+        # Translations already out of date when the watch started are only refreshed with --incremental or once edited.
+        old_hashes = self.hashes
+        self.en_flat, self.flat_keys, self.hashes = en_flat, flat_keys, hashes
+        self.source_keys = list(en_flat)
+        self.keys_needed = []
+        for k in flat_keys:
+            if self.confirmed_unchanged(k):
+                continue
+            if k not in self.progress_flat or self.progress_flat[k] == en_flat[k]:
+                self.keys_needed.append(k)
+            elif self.manifest.get(k) != hashes[k] and (self.incremental or k not in self.stale_keys or old_hashes.get(k) != hashes[k]):
+                self.keys_needed.append(k)
+        self.stale_keys.difference_update(self.keys_needed)
+        return self.keys_needed
+
+    def translated_pairs(self):
+        return [
+            (self.en_flat[k], self.progress_flat[k])
+            for k in self.flat_keys
+            if k in self.progress_flat and self.progress_flat[k] != self.en_flat[k] and k not in self.stale_keys
+        ]
+
+    def apply(self, k, value):
+        # Only validated values get here, so one equal to the English text was confirmed to need no translation
+        h = unchanged_hash(self.hashes[k]) if value == self.en_flat[k] else self.hashes[k]
+        self.progress_flat[k] = value
+        self.manifest[k] = h
+        self.pending.append({"k": k, "v": value, "h": h})
+
+    def checkpoint(self):
+        # Appending only this batch's results keeps the per-batch cost constant
+        if not self.pending:
+            return 0
+        if self.journal is None:
+            self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        self.journal.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.pending))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+        written = len(self.pending)
+        self.pending = []
+        self.checkpoints_since_save += 1
+        if self.save_interval and self.checkpoints_since_save >= self.save_interval:
+            self.save()
+        return written
+
+    def save(self):
+        # Pending results are already in progress_flat, so the full save covers them too
+        self.pending = []
+        # Instead of copying the ENTIRE EN.JSON file and pretending it's Arabic,
+        # we will literally rebuild a nested JSON of ONLY what has been fully processed and tracked in progress_flat!
+        save_json(self.target_file, nest_flat_dict(ordered_flat(self.progress_flat, self.base_keys, self.source_keys)))
+        save_json(self.manifest_file, self.manifest)
+
+        # Everything in the journal is now in the target file
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.checkpoints_since_save = 0
+
+    def finish(self):
+        if self.pending or self.checkpoints_since_save:
+            self.save()
+
+def load_source(source_file, start=0):
     en_data = load_json(source_file)
     if not en_data:
-        print(f"Could not load {source_file}. Exiting.")
-        return
-        
+        return None
+
     en_flat = flatten_dict(en_data)
     flat_keys = [k for k, v in en_flat.items() if isinstance(v, str) and v.strip() != ""]
-    
+
     print(f"Found {len(flat_keys)} total strings in {source_file}")
-    
-    # Load what is ONLY in the target_file right now
-    progress_flat = flatten_dict(load_json(target_file))
-    
+
     # If the user specified a manual start offset using line numbers
-    if args.start > 0:
-        print(f"Applying manual start offset from LINE {args.start}...")
+    if start > 0:
+        print(f"Applying manual start offset from LINE {start}...")
         try:
             with open(source_file, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
             # Calculate how many string values appear BEFORE this line
-            text_before = "".join(lines[:args.start-1]) # 0-indexed internally
+            text_before = "".join(lines[:start-1]) # 0-indexed internally
             # Find all string values formatted like `: "value"`
             skipped_count = len(re.findall(r':\s*"(?:\\.|[^"\\])*"', text_before))
             # Also account for empty string values if they exist, though flat_keys filters them
-            
-            print(f"Line {args.start} corresponds to string index {skipped_count}. Skipping {skipped_count} original items...")
+
+            print(f"Line {start} corresponds to string index {skipped_count}. Skipping {skipped_count} original items...")
             flat_keys = flat_keys[skipped_count:]
         except Exception as e:
-            print(f"Error reading line number {args.start}: {e}")
+            print(f"Error reading line number {start}: {e}")
 
-    # Determine what still needs translation
-    # If the key isn't in ar.json, it hasn't been processed yet.
-    # OR if the text in ar.json exactly matches the English text in en.json
-    keys_needed = [k for k in flat_keys if k not in progress_flat or progress_flat[k] == en_flat[k]]
-    
-    # For progress tracking
-    translated_count = len([k for k in flat_keys if k in progress_flat and progress_flat[k] != en_flat[k]])
-    print(f"Detected {translated_count} already translated strings from the current pool in {target_file}.")
-        
-    print(f"Translating the remaining {len(keys_needed)} strings incrementally.")
-    
-    current_key_idx = args.key_index
-    total_keys = len(API_KEYS)
-    
-    if len(keys_needed) > 0:
-        for i in range(0, len(keys_needed), BATCH_SIZE):
-            batch_keys = keys_needed[i:i+BATCH_SIZE]
-            batch_dict_flat = {k: en_flat[k] for k in batch_keys}
-            
-            success = False
-            retries = 0
-            
-            while not success and retries < total_keys * 2:
-                current_api_key = API_KEYS[current_key_idx]
-                print(f"\nTranslating next {len(batch_keys)} items using API Key Index [{current_key_idx}]...")
-                
-                translated_dict_flat = translate_batch_with_gemini(current_api_key, batch_dict_flat, args.lang)
-                
-                if translated_dict_flat is not None and len(translated_dict_flat) > 0:
-                    for k in batch_keys:
-                        if k in translated_dict_flat:
-                            progress_flat[k] = translated_dict_flat[k]
-                        else:
-                            # If AI skips a key, populate the fallback
-                            progress_flat[k] = en_flat[k] 
-                    
-                    # Instead of copying the ENTIRE EN.JSON file and pretending it's Arabic,
-                    # we will literally rebuild a nested JSON of ONLY what has been fully processed and tracked in progress_flat!
-                    ar_data = nest_flat_dict(progress_flat)
-                    save_json(target_file, ar_data)
-                    
-                    print(f"-> Batch complete. Appended structurally to {target_file}.")
-                    success = True
-                    time.sleep(1) # Prevent rate limits
+    hashes = {k: source_hash(en_flat[k])[:16] for k in flat_keys}
+    return en_flat, flat_keys, hashes
+
+def build_queues(jobs, wire="compact"):
+    # Identical strings are sent once per language, however many keys and files use them
+    units_by_lang = {}
+    for job in jobs:
+        units = units_by_lang.setdefault(job.language, {})
+        for k in job.keys_needed:
+            units.setdefault(job.en_flat[k], []).append((job, k))
+
+    queues = {}
+    for language, units in units_by_lang.items():
+        needed = sum(len(targets) for targets in units.values())
+        if len(units) < needed:
+            print(f"Deduplicated {needed} {language} strings down to {len(units)} unique ones.")
+        queues[language] = deque(
+            (targets[0][1], text, targets, item_tokens(targets[0][1], text, wire)) for text, targets in units.items()
+        )
+    return queues
+
+def pack_batch(queue, token_budget, max_items):
+    units = []
+    batch_keys = set()
+    tokens = 0
+    while queue and len(units) < max_items:
+        rep_key, text, targets, cost = queue[0]
+        # Always take at least one string; two files can also use the same key path for different text
+        if units and (tokens + cost > token_budget or rep_key in batch_keys):
+            break
+        queue.popleft()
+        units.append((rep_key, text, targets, cost))
+        batch_keys.add(rep_key)
+        tokens += cost
+    return units
+
+class BatchScheduler:
+    """Packs queued strings into batches, keeps them in flight across the key pool and folds validated results into the jobs."""
+
+    def __init__(self, key_pool, memory, args):
+        self.key_pool = key_pool
+        self.memory = memory
+        self.args = args
+        self.concurrency = max(1, args.concurrency or len(key_pool.keys))
+        self.budget = TokenBudget(args.token_budget, args.min_token_budget, args.max_token_budget)
+
+    def run(self, jobs):
+        # Returns False if the run had to be aborted because no key could get a batch through
+        self.queues = build_queues(jobs, self.args.wire)
+        self.retries = {language: deque() for language in self.queues}
+        self.attempts = {}
+        self.echoed = set()
+        self.given_up = 0
+        languages = list(self.queues)
+        dispatched = 0
+        failed = False
+
+        def next_batch():
+            # Rotate through languages so every target makes progress while the whole matrix runs
+            for offset in range(len(languages)):
+                language = languages[(dispatched + offset) % len(languages)]
+                if self.retries[language]:
+                    return language, self.retries[language].popleft()
+                units = pack_batch(self.queues[language], self.budget.current, self.args.batch_size)
+                if units:
+                    return language, units
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = {}
+            while True:
+                while not failed and len(in_flight) < self.concurrency:
+                    batch = next_batch()
+                    if batch is None:
+                        break
+                    language, units = batch
+                    # The key pool spreads in-flight requests across every healthy key
+                    future = pool.submit(
+                        run_batch,
+                        {rep_key: text for rep_key, text, _, _ in units},
+                        language,
+                        self.key_pool,
+                        self.args.max_attempts,
+                        self.args.wire,
+                        self.args.api_base,
+                    )
+                    in_flight[future] = batch
+                    dispatched += 1
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    language, units = in_flight.pop(future)
+                    truncated = False
+                    try:
+                        translated_dict_flat = future.result()
+                    except MalformedResponseError as e:
+                        self.budget.shrink()
+                        print(f"[!] {e}. Shrinking the token budget to {self.budget.current}.")
+                        translated_dict_flat = e.partial
+                        truncated = True
+
+                    if translated_dict_flat is None:
+                        if not failed:
+                            print("All API keys failed or rate-limited. Aborting script. You can run it again later to resume.")
+                            failed = True
+                        continue
+
+                    if not truncated:
+                        self.budget.grow()
+                    self.handle_result(language, units, translated_dict_flat, truncated)
+
+        if self.given_up:
+            print(f"[!] {self.given_up} strings could not be translated this run and were left out. Run again to retry them.")
+        return not failed
+
+    def handle_result(self, language, units, translated_dict_flat, truncated):
+        alone = len(units) == 1
+        good, bad, cut_off = [], {}, []
+        for unit in units:
+            rep_key, text = unit[0], unit[1]
+            if truncated and not alone and rep_key not in translated_dict_flat:
+                cut_off.append(unit)
+                continue
+            # Echoed once, then echoed again when asked about on its own: it reads the same in this language
+            reason = validate_translation(text, translated_dict_flat.get(rep_key), alone and id(unit[2]) in self.echoed)
+            if reason == "left untranslated":
+                self.echoed.add(id(unit[2]))
+            if reason:
+                bad.setdefault(reason, []).append(unit)
+            else:
+                good.append(unit)
+
+        touched = {}
+        for rep_key, _, targets, _ in good:
+            for job, k in targets:
+                job.apply(k, translated_dict_flat[rep_key])
+                touched[id(job)] = job
+
+        if self.memory is not None and good:
+            pairs = [(text, translated_dict_flat[rep_key]) for rep_key, text, _, _ in good]
+            self.memory.store(pairs, language)
+            self.memory.store_unchanged([src for src, dst in pairs if dst.strip() == src.strip()], language)
+
+        for job in touched.values():
+            written = job.checkpoint()
+            print(f"-> Batch complete. Journaled {written} strings for {job.target_file}.")
+
+        # Strings lost to a cut-off response did nothing wrong, so they go back in smaller pieces without using up a retry
+        if cut_off:
+            self.requeue(language, cut_off)
+
+        if bad:
+            summary = ", ".join(f"{reason}: {len(reason_units)}" for reason, reason_units in bad.items())
+            print(f"[!] {sum(len(u) for u in bad.values())} of {len(units)} strings came back unusable ({summary}); re-queueing only those.")
+            retry_units = []
+            for unit in (u for reason_units in bad.values() for u in reason_units):
+                attempts = self.attempts[id(unit[2])] = self.attempts.get(id(unit[2]), 0) + 1
+                if attempts > self.args.string_retries:
+                    print(f"[!] Giving up on {unit[0]} for now.")
+                    self.given_up += 1
                 else:
-                    print("-> Batch Failed. Rotating API key.")
-                    current_key_idx = (current_key_idx + 1) % total_keys
-                    retries += 1
-                    time.sleep(2)
-                    
-            if not success:
-                print("All API keys failed or rate-limited. Aborting script. You can run it again later to resume.")
-                break
-                
+                    retry_units.append(unit)
+            self.requeue(language, retry_units)
+
+    def requeue(self, language, units):
+        # Retries go ahead of new work; echoed strings and the last retry of a string are sent on their own
+        last_try, others = [], []
+        for u in units:
+            alone = self.attempts.get(id(u[2]), 0) >= self.args.string_retries or id(u[2]) in self.echoed
+            (last_try if alone else others).append(u)
+        half = (len(others) + 1) // 2
+        for chunk in (others[:half], others[half:], *([u] for u in last_try)):
+            if chunk:
+                self.retries[language].append(chunk)
+
+class SourceWatcher:
+    """Blocks until watched source files change, using watchdog events when available and mtime polling otherwise."""
+
+    def __init__(self, paths, interval=1.0, settle=0.3):
+        # Absolute path -> the path as the caller spelled it
+        self.paths = {os.path.abspath(p): p for p in paths}
+        self.interval = interval
+        self.settle = settle
+        self.stamps = {p: self.stamp(p) for p in self.paths}
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.observer = None
+        if Observer is not None:
+            self.observer = Observer()
+            # Watch the directories, not the files: editors often save by writing a temp file and renaming it over
+            for directory in {os.path.dirname(p) for p in self.paths}:
+                self.observer.schedule(self, directory, recursive=False)
+            self.observer.start()
+        self.backend = "watchdog" if self.observer is not None else f"polling every {interval:g}s"
+
+    def stamp(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def notify(self, path):
+        path = os.path.abspath(path)
+        if path in self.paths:
+            with self.lock:
+                self.changed.add(path)
+            self.event.set()
+
+    def dispatch(self, event):
+        # Called from watchdog's observer thread. Opens and no-write closes (our own reads included) aren't changes.
+        if event.event_type not in ("modified", "created", "moved", "closed"):
+            return
+        self.notify(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            self.notify(dest_path)
+
+    def poll(self):
+        for path in self.paths:
+            if self.stamp(path) != self.stamps[path]:
+                self.notify(path)
+
+    def wait(self):
+        while True:
+            # Polling also runs alongside watchdog as a safety net for events it can miss (e.g. network drives)
+            while not self.event.is_set():
+                self.poll()
+                self.event.wait(self.interval)
+            # Let a burst of writes from one save settle before reading the file
+            time.sleep(self.settle)
+            with self.lock:
+                notified, self.changed = self.changed, set()
+                self.event.clear()
+
+            # Only files whose (mtime, size) actually moved count, whatever event announced them
+            changed = []
+            for path in sorted(notified):
+                stamp = self.stamp(path)
+                if stamp != self.stamps[path]:
+                    self.stamps[path] = stamp
+                    changed.append(self.paths[path])
+            if changed:
+                return changed
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+def serve_from_memory(jobs, memory):
+    for job in jobs:
+        cached = memory.lookup({job.en_flat[k] for k in job.keys_needed}, job.language)
+        if cached:
+            for k in job.keys_needed:
+                if job.en_flat[k] in cached:
+                    job.apply(k, cached[job.en_flat[k]])
+            job.keys_needed = [k for k in job.keys_needed if job.en_flat[k] not in cached]
+            job.checkpoint()
+            print(f"Served {len(cached)} unique strings for {job.target_file} from the translation memory.")
+
+def watch_sources(jobs, scheduler, memory, interval):
+    # Stays resident with the key pool, scheduler, memory and every target already loaded,
+    # so a save only costs re-reading the source and translating what changed in it
+    jobs_by_source = {}
+    for job in jobs:
+        jobs_by_source.setdefault(job.source_file, []).append(job)
+
+    watcher = SourceWatcher(jobs_by_source, interval)
+    print(f"Watching {len(jobs_by_source)} source file(s) for changes ({watcher.backend}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            changed = watcher.wait()
+            started = time.monotonic()
+            updated = []
+            for source_file in changed:
+                loaded = load_source(source_file)
+                if loaded is None:
+                    print(f"[!] Could not parse {source_file}; waiting for the next save.")
+                    continue
+                for job in jobs_by_source[source_file]:
+                    job.update_source(*loaded)
+                    updated.append(job)
+
+            needed = sum(len(job.keys_needed) for job in updated)
+            if not needed:
+                print("-> No new or changed strings.")
+                continue
+
+            print(f"-> {needed} new or changed strings.")
+            if memory is not None:
+                serve_from_memory(updated, memory)
+            scheduler.key_pool.revive()
+            completed = scheduler.run(updated)
+            for job in updated:
+                job.finish()
+            if completed:
+                print(f"-> Targets updated in {time.monotonic() - started:.1f}s. Watching for changes...")
+            else:
+                print("[!] This pass couldn't translate everything; what is left will be retried on the next save. Watching for changes...")
+    except KeyboardInterrupt:
+        print("\nStopping watch...")
+    finally:
+        watcher.stop()
+
+def measure_wire(source_files, language, batch_size, token_budget):
+    # Compare both prompt formats on the same batches; tokens are the same ~4 chars/token estimate used for packing
+    for source_file in source_files:
+        loaded = load_source(source_file)
+        if loaded is None:
+            print(f"Could not load {source_file}.")
+            continue
+        en_flat, flat_keys, _ = loaded
+
+        queue = deque((k, en_flat[k], None, item_tokens(k, en_flat[k])) for k in flat_keys)
+        batches = []
+        while queue:
+            batches.append({k: text for k, text, _, _ in pack_batch(queue, token_budget, batch_size)})
+
+        totals = {}
+        for wire in ("nested", "compact"):
+            prompt_bytes = prompt_tokens = response_tokens = 0
+            for batch_dict_flat in batches:
+                prompt = build_prompt(batch_dict_flat, language, wire)
+                # The model answers with the same JSON shape, so the payload approximates the response
+                payload = prompt.split("JSON to translate:\n", 1)[1]
+                prompt_bytes += len(prompt.encode('utf-8'))
+                prompt_tokens += estimate_tokens(prompt)
+                response_tokens += estimate_tokens(payload)
+            totals[wire] = (prompt_tokens, response_tokens)
+            print(f"  {wire:<8} {prompt_bytes:>10,} prompt bytes  ~{prompt_tokens:>8,} prompt tokens  ~{response_tokens:>8,} response tokens")
+
+        (nested_prompt, nested_response), (compact_prompt, compact_response) = totals["nested"], totals["compact"]
+        print(
+            f"  -> {len(batches)} batches: compact saves {1 - compact_prompt / nested_prompt:.0%} of prompt tokens "
+            f"and {1 - compact_response / nested_response:.0%} of response tokens"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Translate JSON using Gemini API")
+    parser.add_argument("--source", type=str, nargs="+", required=True, help="Path(s) to the source JSON file(s) (e.g. en.json)")
+    parser.add_argument("--target", type=str, help="Path to the output JSON file (e.g. ar.json) when translating a single source into a single language")
+    parser.add_argument("--lang", type=str, action="append", required=True, help="Target language (e.g. 'French', 'Arabic'). Repeatable as 'Arabic=ar.json' to write a file next to each source")
+    parser.add_argument("--start", type=int, default=0, help="Line/Item index to start from (skip the first N string values)")
+    parser.add_argument("--batch-size", type=int, default=150, help="Max number of strings to send to Gemini per batch (the token budget usually decides first)")
+    parser.add_argument("--token-budget", type=int, default=2000, help="Initial estimated source tokens per batch; adapts to how Gemini copes")
+    parser.add_argument("--min-token-budget", type=int, default=200, help="Smallest token budget to shrink to after truncated or broken responses")
+    parser.add_argument("--max-token-budget", type=int, default=8000, help="Largest token budget to grow to after clean responses")
+    parser.add_argument("--key-index", type=int, default=0, help="Index of the API key to start with from the .env file")
+    parser.add_argument("--concurrency", type=int, default=None, help="Number of batches to keep in flight at once (default: one per API key)")
+    parser.add_argument("--rpm", type=float, default=10, help="Max requests per minute per API key (0 disables the limit)")
+    parser.add_argument("--max-attempts", type=int, default=6, help="Attempts per batch across keys before giving up on the run")
+    parser.add_argument("--string-retries", type=int, default=3, help="Times a string that comes back missing, empty, untranslated or with broken placeholders is re-sent")
+    parser.add_argument("--incremental", action="store_true", help="Also retranslate strings whose English text changed since they were translated")
+    parser.add_argument("--memory", type=str, default=".translation_memory.sqlite", help="Path to the translation memory database shared across runs")
+    parser.add_argument("--no-memory", action="store_true", help="Don't read from or write to the translation memory")
+    parser.add_argument("--wire", choices=["compact", "nested"], default="compact", help="Prompt format: numeric ids (compact) or the nested key tree (nested)")
+    parser.add_argument("--measure-wire", action="store_true", help="Only print how many prompt/response tokens each format needs for the sources, then exit")
+    parser.add_argument("--api-base", type=str, default=None, help="Gemini API base URL, e.g. a local mock_gemini.py server (default: $GEMINI_API_BASE or Google's)")
+    parser.add_argument("--save-interval", type=int, default=0, help="Rewrite the target files every N batches (default: only at the end; progress is journaled either way)")
+    parser.add_argument("--watch", action="store_true", help="Keep running after the first pass and translate new or changed strings whenever a source file is saved")
+    parser.add_argument("--watch-interval", type=float, default=1.0, help="Seconds between source checks when polling (watchdog isn't installed) (default: 1)")
+    args = parser.parse_args()
+
+    if args.measure_wire:
+        measure_wire(args.source, args.lang[0].partition("=")[0].strip(), args.batch_size, args.token_budget)
+        return
+
+    lang_specs = []
+    for spec in args.lang:
+        language, has_target, target_name = spec.partition("=")
+        lang_specs.append((language.strip(), target_name.strip() if has_target else None))
+
+    if args.target:
+        if len(args.source) > 1 or len(lang_specs) > 1 or lang_specs[0][1] is not None:
+            parser.error("--target only works with a single --source and a single plain --lang; use --lang 'Arabic=ar.json' instead")
+    elif any(target_name is None for _, target_name in lang_specs):
+        parser.error("--lang needs a target file name (e.g. 'Arabic=ar.json') when --target is not given")
+    if args.start > 0 and len(args.source) > 1:
+        parser.error("--start only works with a single --source")
+    if args.start > 0 and args.watch:
+        parser.error("--start can't be combined with --watch")
+
+    # Load environment variables
+    load_dotenv(".env")
+    load_dotenv("backend/.env")
+    args.api_base = args.api_base or os.environ.get("GEMINI_API_BASE", DEFAULT_API_BASE)
+
+    # Find API keys
+    API_KEYS = [value.strip() for key, value in os.environ.items() if "GEMINI" in key and "API_KEY" in key]
+    if not API_KEYS:
+        print("Warning: No Gemini API keys found in .env! (Defaulting to YOUR_API_KEY_1)")
+        API_KEYS = ["YOUR_API_KEY_1"]
+
+    # Every source is loaded and flattened once, however many languages it is translated into
+    jobs = []
+    for source_file in args.source:
+        loaded = load_source(source_file, args.start)
+        if loaded is None:
+            print(f"Could not load {source_file}. Exiting.")
+            return
+        en_flat, flat_keys, hashes = loaded
+
+        for language, target_name in lang_specs:
+            target_file = os.path.join(os.path.dirname(source_file), target_name) if target_name else args.target
+            job = TranslationJob(source_file, en_flat, flat_keys, hashes, target_file, language, args.save_interval)
+            job.plan(args.incremental)
+            jobs.append(job)
+
+    memory = None if args.no_memory else TranslationMemory(args.memory)
+
+    if memory is not None:
+        # Whatever the targets already have translated is worth remembering for other files
+        for job in jobs:
+            memory.store(job.translated_pairs(), job.language, overwrite=False)
+
+        serve_from_memory(jobs, memory)
+
+    try:
+        key_pool = KeyPool(API_KEYS, args.rpm, args.key_index % len(API_KEYS))
+        scheduler = BatchScheduler(key_pool, memory, args)
+        scheduler.run(jobs)
+        if args.watch:
+            for job in jobs:
+                job.finish()
+            watch_sources(jobs, scheduler, memory, args.watch_interval)
+    finally:
+        # The nested target files are only rebuilt here (or every --save-interval batches)
+        for job in jobs:
+            job.finish()
+        if memory is not None:
+            memory.close()
+
     print("Done!")
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Translation Key Usage Index
+Finds every translation key referenced from the web and backend sources, cross-references them with
+the locale files, reports unused and missing keys and can write pruned locale bundles.
+"""
+"""
+ python locale_keys.py
+ python locale_keys.py --unused --missing
+ python locale_keys.py --prune build/locales
+"""
+import json
+import os
+import re
+import argparse
+
+from gemini_translate import iter_flat, nest_flat_dict, load_json, save_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APPS = [
+    ("web", "web/src", "web/src/locales"),
+    ("backend", "backend/src", "backend/src/common/i18n/locales"),
+]
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs")
+SKIP_DIRS = {"node_modules", "dist", "build", "locales"}
+PLURAL_SUFFIXES = ("_zero", "_one", "_two", "_few", "_many", "_other", "_plural")
+
+QUOTED_RE = re.compile(r"""(['"])((?:\\.|(?!\1)[^\\\n])*)\1""")
+TEMPLATE_RE = re.compile(r"`((?:\\.|[^`\\])*)`")
+# Places where a string is meant to be a key: t("..."), i18n.t("..."), i18nService.t("...") and fooKey: "..."
+KEY_CONTEXT_RE = re.compile(r"""(?:\bt\(\s*|\w+Key\s*[:=]\s*)$""")
+KEY_SHAPE_RE = re.compile(r"[A-Za-z_][\w-]*(?:\.[\w-]+)*")
+
+
+class KeyIndex:
+    """Every key reference found in one app's source tree."""
+
+    def __init__(self):
+        self.literals = set()
+        self.explicit = {}
+        self.patterns = set()
+
+    def add_literal(self, text, explicit, location):
+        if not KEY_SHAPE_RE.fullmatch(text):
+            return
+        self.literals.add(text)
+        if explicit:
+            self.explicit.setdefault(text, location)
+
+    def add_template(self, template):
+        # `settings.gym.services.${service}` -> any key matching settings\.gym\.services\..+?
+        parts = re.split(r"\$\{[^}]*\}", template)
+        if len(parts) < 2 or not any("." in part for part in parts):
+            return
+        self.patterns.add("".join(re.escape(part) + ".+?" for part in parts[:-1]) + re.escape(parts[-1]))
+
+
+def source_files(src_dir):
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            if name.endswith(SOURCE_EXTENSIONS) and not name.endswith(".d.ts"):
+                yield os.path.join(dirpath, name)
+
+
+def index_sources(src_dir):
+    index = KeyIndex()
+    for path in source_files(src_dir):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+
+        rel_path = os.path.relpath(path, ROOT)
+
+        def add(match, literal):
+            explicit = bool(KEY_CONTEXT_RE.search(text, max(0, match.start() - 40), match.start()))
+            index.add_literal(literal, explicit, f"{rel_path}:{text.count(chr(10), 0, match.start()) + 1}")
+
+        for match in QUOTED_RE.finditer(text):
+            add(match, match.group(2))
+
+        for match in TEMPLATE_RE.finditer(text):
+            if "${" in match.group(1):
+                index.add_template(match.group(1))
+            else:
+                add(match, match.group(1))
+    return index
+
+
+def locale_keys(locale_file):
+    return [path.replace("|", ".") for path, value in iter_flat(load_json(locale_file)) if isinstance(value, str)]
+
+
+def used_keys(keys, index):
+    used = set()
+    prefixes = {}
+    for key in keys:
+        parts = key.split(".")
+        for i in range(1, len(parts)):
+            prefixes.setdefault(".".join(parts[:i]), []).append(key)
+
+    for literal in index.literals:
+        # A literal that names a whole subtree ("settings.gym") is probably combined with something at runtime
+        if "." in literal or literal in index.explicit:
+            used.update(prefixes.get(literal, ()))
+
+    literal_set = index.literals
+    pattern = re.compile("|".join(f"(?:{p})" for p in index.patterns)) if index.patterns else None
+    for key in keys:
+        base = key
+        for suffix in PLURAL_SUFFIXES:
+            if key.endswith(suffix):
+                base = key[: -len(suffix)]
+                break
+        if (
+            (key in literal_set and ("." in key or key in index.explicit))
+            or (base != key and base in literal_set)
+            or (pattern is not None and pattern.fullmatch(key))
+        ):
+            used.add(key)
+    return used
+
+
+def missing_keys(keys, index):
+    known = set(keys)
+    known_prefixes = {".".join(k.split(".")[:i]) for k in keys for i in range(1, k.count(".") + 1)}
+    missing = {}
+    for literal, location in index.explicit.items():
+        if literal in known or literal in known_prefixes:
+            continue
+        if any(f"{literal}{suffix}" in known for suffix in PLURAL_SUFFIXES):
+            continue
+        missing[literal] = location
+    return missing
+
+
+def prune_locale(locale_file, used):
+    kept = {path: value for path, value in iter_flat(load_json(locale_file)) if path.replace("|", ".") in used}
+    return nest_flat_dict(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report unused and missing translation keys, and optionally write pruned locale bundles",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Keys are matched against every string literal in the sources, so keys kept in config objects
+(labelKey: "landing.nav.home") count as used. Template literals such as `settings.gym.${id}`
+mark every key they could produce as used; nothing is ever reported unused just because it is
+only reached dynamically through a variable holding a whole subtree name.
+        ''',
+    )
+    parser.add_argument("--app", nargs=3, action="append", metavar=("NAME", "SRC_DIR", "LOCALES_DIR"), help="App to index (default: web and backend)")
+    parser.add_argument("--source-lang", default="en", help="Locale whose keys are the reference set (default: en)")
+    parser.add_argument("--unused", action="store_true", help="List every unused key")
+    parser.add_argument("--missing", action="store_true", help="List every key used in t(...) that no locale defines")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    parser.add_argument("--prune", metavar="OUT_DIR", help="Write pruned copies of every locale file to OUT_DIR/<app>/")
+    args = parser.parse_args()
+
+    apps = args.app or [(name, os.path.join(ROOT, src), os.path.join(ROOT, locales)) for name, src, locales in DEFAULT_APPS]
+    report = {}
+
+    for name, src_dir, locales_dir in apps:
+        source_locale = os.path.join(locales_dir, f"{args.source_lang}.json")
+        if not os.path.exists(source_locale):
+            print(f"⚠️ {source_locale} not found, skipping {name}")
+            continue
+
+        keys = locale_keys(source_locale)
+        index = index_sources(src_dir)
+        used = used_keys(keys, index)
+        unused = [k for k in keys if k not in used]
+        missing = missing_keys(keys, index)
+        report[name] = {"keys": len(keys), "used": len(used), "unused": unused, "missing": missing}
+
+        if not args.json:
+            print(f"{name}: {len(keys)} keys in {os.path.relpath(source_locale, ROOT)}, {len(used)} used, {len(unused)} unused, {len(missing)} missing")
+            if args.unused:
+                for key in unused:
+                    print(f"  unused   {key}")
+            if args.missing:
+                for key, location in sorted(missing.items()):
+                    print(f"  missing  {key}  ({location})")
+
+        if args.prune:
+            out_dir = os.path.join(args.prune, name)
+            os.makedirs(out_dir, exist_ok=True)
+            for file_name in sorted(os.listdir(locales_dir)):
+                if not file_name.endswith(".json") or file_name.startswith("."):
+                    continue
+                locale_file = os.path.join(locales_dir, file_name)
+                out_file = os.path.join(out_dir, file_name)
+                save_json(out_file, prune_locale(locale_file, used))
+                if not args.json:
+                    before, after = os.path.getsize(locale_file), os.path.getsize(out_file)
+                    print(f"  pruned {file_name}: {before:,} -> {after:,} bytes")
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Mock Gemini Server
+Speaks the generateContent request/response shape used by gemini_translate.py so the translator
+can be exercised offline, with simulated latency, rate limits, truncated JSON and dropped keys.
+"""
+"""
+ python mock_gemini.py --port 8765 --latency 0.5 --rpm 10 --truncate-rate 0.05 --drop-rate 0.02
+ GEMINI_API_BASE=http://127.0.0.1:8765 python gemini_translate.py --source web/src/locales/en.json --lang Arabic=ar.json
+"""
+import json
+import random
+import re
+import threading
+import time
+import argparse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PAYLOAD_MARKER = "JSON to translate:\n"
+PLACEHOLDER_RE = re.compile(r"(\{\{[^{}]*\}\})")
+
+
+class MockGemini:
+    """Simulation settings plus the counters a benchmark reads back from /stats."""
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        rpm=0,
+        rate_limit_rate=0.0,
+        retry_after=2.0,
+        truncate_rate=0.0,
+        drop_rate=0.0,
+        max_output_chars=0,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rpm = rpm
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.drop_rate = drop_rate
+        self.max_output_chars = max_output_chars
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_by_key = {}
+        self.stats = {
+            "requests": 0,
+            "ok": 0,
+            "rate_limited": 0,
+            "truncated": 0,
+            "dropped_strings": 0,
+            "strings": 0,
+            "prompt_bytes": 0,
+            "response_bytes": 0,
+        }
+
+    def count(self, **deltas):
+        with self.lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def over_rpm(self, api_key):
+        # Sliding one-minute window per key, like the real per-key quota
+        if not self.rpm:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            window = self.requests_by_key.setdefault(api_key, deque())
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.rpm:
+                return True
+            window.append(now)
+            return False
+
+    def translate_value(self, value, language):
+        # Deterministic stand-in translation that changes the text but leaves placeholders alone
+        tag = language[:2].lower()
+        parts = PLACEHOLDER_RE.split(value)
+        return "".join(part if PLACEHOLDER_RE.fullmatch(part) else part[::-1] for part in parts) + f" [{tag}]"
+
+    def translate_tree(self, tree, language):
+        translated = {}
+        dropped = 0
+        for key, value in tree.items():
+            if isinstance(value, dict):
+                translated[key], sub_dropped = self.translate_tree(value, language)
+                dropped += sub_dropped
+            elif self.roll(self.drop_rate):
+                dropped += 1
+            else:
+                translated[key] = self.translate_value(str(value), language)
+        return translated, dropped
+
+    def generate(self, api_key, body):
+        """Returns (status, headers, response body) for one generateContent call."""
+        prompt = body["contents"][0]["parts"][0]["text"]
+        self.count(requests=1, prompt_bytes=len(prompt.encode("utf-8")))
+
+        if self.over_rpm(api_key) or self.roll(self.rate_limit_rate):
+            self.count(rate_limited=1)
+            error = {
+                "error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [
+                        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{self.retry_after:g}s"}
+                    ],
+                }
+            }
+            return 429, {"Retry-After": f"{self.retry_after:g}"}, error
+
+        if self.latency or self.jitter:
+            with self.lock:
+                delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, delay))
+
+        language_match = re.search(r"from English to (.+?)\.", prompt)
+        language = language_match.group(1) if language_match else "xx"
+        tree = json.loads(prompt.split(PAYLOAD_MARKER, 1)[1])
+        translated, dropped = self.translate_tree(tree, language)
+        text = json.dumps(translated, ensure_ascii=False)
+        self.count(strings=sum(1 for _ in _leaves(tree)), dropped_strings=dropped)
+
+        cut = None
+        if self.max_output_chars and len(text) > self.max_output_chars:
+            cut = self.max_output_chars
+        elif self.roll(self.truncate_rate):
+            with self.lock:
+                cut = self.random.randint(len(text) // 3, max(len(text) // 3, len(text) - 1))
+
+        finish_reason = "STOP"
+        if cut is not None:
+            # Cut the JSON off mid-way, the way a response that hit its output limit looks
+            text = text[:cut]
+            finish_reason = "MAX_TOKENS"
+            self.count(truncated=1)
+        else:
+            self.count(ok=1)
+
+        response = {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": finish_reason,
+                }
+            ]
+        }
+        return 200, {}, response
+
+
+def _leaves(tree):
+    for value in tree.values():
+        if isinstance(value, dict):
+            yield from _leaves(value)
+        else:
+            yield value
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            mock.count(response_bytes=len(data))
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/stats":
+                with mock.lock:
+                    stats = dict(mock.stats)
+                self._send(200, stats)
+            else:
+                self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if not re.fullmatch(r"/v1beta/models/[^/:]+:generateContent", url.path):
+                self._send(404, {"error": {"code": 404, "message": f"Unknown endpoint {url.path}"}})
+                return
+
+            api_key = parse_qs(url.query).get("key", [""])[0]
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                status, headers, response = mock.generate(api_key, body)
+            except (ValueError, KeyError, IndexError) as e:
+                self._send(400, {"error": {"code": 400, "message": f"Bad request: {e}", "status": "INVALID_ARGUMENT"}})
+                return
+            self._send(status, response, headers)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(mock, host="127.0.0.1", port=0):
+    """Creates (but doesn't start) a threaded server; port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering each request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to --latency")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute allowed per API key before answering 429 (0 = unlimited)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a spurious 429 on any request")
+    parser.add_argument("--retry-after", type=float, default=2.0, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Probability of cutting a response's JSON short (finishReason MAX_TOKENS)")
+    parser.add_argument("--max-output-chars", type=int, default=0, help="Always truncate responses longer than this many characters (0 = never)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability of leaving out each individual string")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    mock = MockGemini(
+        latency=args.latency,
+        jitter=args.jitter,
+        rpm=args.rpm,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        truncate_rate=args.truncate_rate,
+        drop_rate=args.drop_rate,
+        max_output_chars=args.max_output_chars,
+        seed=args.seed,
+    )
+    server = make_server(mock, args.host, args.port)
+    print(f"Mock Gemini listening on http://{args.host}:{server.server_port} (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock server...")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
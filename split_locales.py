@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Namespace Locale Splitter
+Splits each monolithic locale file into one chunk per top-level namespace with a content-hashed
+file name, plus a manifest mapping language -> namespace -> chunk, so the app can lazy-load only
+the namespaces a route needs. Only chunks whose content changed are rewritten.
+"""
+"""
+ python split_locales.py
+ python split_locales.py --locales web/src/locales --out web/public/locales --clean
+"""
+import json
+import os
+import argparse
+
+from gemini_translate import iter_flat, nest_flat_dict, load_json, save_json, source_hash
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Top-level keys that aren't objects can't form a namespace of their own, so they share this one
+ROOT_NAMESPACE = "_root"
+
+
+def split_namespaces(data, sep='|'):
+    """Groups the flattened tree by its first path segment and nests each group back up."""
+    groups = {}
+    for path, value in iter_flat(data, sep=sep):
+        namespace, _, rest = path.partition(sep)
+        if rest:
+            groups.setdefault(namespace, {})[rest] = value
+        else:
+            groups.setdefault(ROOT_NAMESPACE, {})[namespace] = value
+    return {namespace: nest_flat_dict(flat, sep=sep) for namespace, flat in groups.items()}
+
+
+def chunk_bytes(chunk):
+    # Minified: these files are only ever read by the browser
+    return json.dumps(chunk, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_bytes(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    manifest = load_json(path)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return source_hash(f.read().decode('utf-8'))
+
+
+def split_language(locale_file, language, out_dir, previous, hash_length):
+    """Returns (manifest entry, chunks written, chunks reused)."""
+    digest = file_digest(locale_file)
+    namespaces = previous.get("namespaces", {})
+
+    # Unchanged source and every chunk still on disk: nothing to parse
+    if previous.get("source_hash") == digest and all(os.path.exists(os.path.join(out_dir, chunk)) for chunk in namespaces.values()):
+        return previous, 0, len(namespaces)
+
+    language_dir = os.path.join(out_dir, language)
+    os.makedirs(language_dir, exist_ok=True)
+
+    entry = {"source": os.path.relpath(locale_file, out_dir).replace(os.sep, "/"), "source_hash": digest, "namespaces": {}}
+    written = reused = 0
+    for namespace, chunk in split_namespaces(load_json(locale_file)).items():
+        data = chunk_bytes(chunk)
+        chunk_name = f"{language}/{namespace}.{source_hash(data.decode('utf-8'))[:hash_length]}.json"
+        chunk_path = os.path.join(out_dir, chunk_name)
+        if os.path.exists(chunk_path):
+            reused += 1
+        else:
+            write_bytes(chunk_path, data)
+            written += 1
+        entry["namespaces"][namespace] = chunk_name
+    return entry, written, reused
+
+
+def remove_stale_chunks(out_dir, manifest):
+    live = {chunk for entry in manifest["languages"].values() for chunk in entry["namespaces"].values()}
+    removed = 0
+    for language in manifest["languages"]:
+        language_dir = os.path.join(out_dir, language)
+        if not os.path.isdir(language_dir):
+            continue
+        for name in os.listdir(language_dir):
+            if name.endswith(".json") and f"{language}/{name}" not in live:
+                os.remove(os.path.join(language_dir, name))
+                removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Split locale files into content-hashed per-namespace chunks with a manifest",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+The manifest (manifest.json in the output directory) looks like:
+  {"version": 1, "languages": {"en": {"source": "...", "source_hash": "...",
+                                      "namespaces": {"common": "en/common.1a2b3c4d.json", ...}}}}
+Chunk names change only when their content does, so they can be cached forever.
+        ''',
+    )
+    parser.add_argument("--locales", default=os.path.join(ROOT, "web/src/locales"), help="Directory holding <lang>.json files (default: web/src/locales)")
+    parser.add_argument("--out", default=os.path.join(ROOT, "web/public/locales"), help="Output directory for chunks and manifest (default: web/public/locales)")
+    parser.add_argument("--lang", nargs="+", help="Language codes to split (default: every <lang>.json in --locales)")
+    parser.add_argument("--hash-length", type=int, default=8, help="Hex digits of the content hash kept in chunk names (default: 8)")
+    parser.add_argument("--clean", action="store_true", help="Delete chunks that the new manifest no longer references")
+    args = parser.parse_args()
+
+    languages = args.lang or sorted(
+        name[:-len(".json")] for name in os.listdir(args.locales) if name.endswith(".json") and not name.startswith(".")
+    )
+    if not languages:
+        print(f"⚠️ No locale files found in {args.locales}")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    previous = load_manifest(args.out).get("languages", {})
+    manifest = {"version": MANIFEST_VERSION, "languages": {}}
+
+    for language in languages:
+        locale_file = os.path.join(args.locales, f"{language}.json")
+        if not os.path.exists(locale_file):
+            print(f"⚠️ {locale_file} not found, skipping")
+            continue
+        entry, written, reused = split_language(locale_file, language, args.out, previous.get(language, {}), args.hash_length)
+        manifest["languages"][language] = entry
+        print(f"{language}: {len(entry['namespaces'])} namespaces, {written} written, {reused} unchanged")
+
+    # Keep languages that weren't part of this run
+    for language, entry in previous.items():
+        manifest["languages"].setdefault(language, entry)
+
+    if manifest["languages"] != previous:
+        save_json(os.path.join(args.out, MANIFEST_NAME), manifest)
+
+    if args.clean:
+        removed = remove_stale_chunks(args.out, manifest)
+        if removed:
+            print(f"Removed {removed} stale chunk(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,248 @@ Monitors a dependency version in package.json and syncs it across multiple proje
 """
  python watch_package.py --watch packages/client/package.json --dependency @ahmedrioueche/gympro-client --targets web/package.json backend/package.json
 """
+import ctypes
+import ctypes.util
+import hashlib
 import json
+import os
+import queue
+import select
+import shutil
+import signal
+import struct
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import argparse
 
 
+class PollBackend:
+    """Wakes up every interval seconds; works everywhere"""
+
+    name = 'poll'
+
+    def __init__(self, path: Path, interval: float):
+        self.path = path
+        self.interval = interval
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the file may have changed, or at most timeout seconds"""
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Linux inotify on the file's directory, so atomic rename-over saves are seen too"""
+
+    name = 'inotify'
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, path: Path):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.path = path
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        directory = str(path.parent.resolve()).encode()
+        if libc.inotify_add_watch(self.fd, directory, self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed for {path.parent}')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until something in the directory is written, then report whether it was our file"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        offset = 0
+        matched = False
+        while offset < len(data):
+            _, _, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0').decode(errors='replace')
+            offset += name_len
+            if name == self.path.name:
+                matched = True
+        return matched
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SyncCancelled(Exception):
+    """Raised inside a sync once a newer version has superseded it"""
+
+
+DEFAULT_HISTORY_PATH = '.watch_package_history.jsonl'
+REPORT_STAGE_ORDER = {stage: i for i, stage in enumerate(['sync', 'build', 'publish', 'manifest', 'install', 'link', 'target'])}
+
+
+class SyncRecorder:
+    """Per-stage timings, exit codes and output sizes of one sync, appended to the history as one JSON line"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.monotonic()
+        self.stages: List[dict] = []
+        self.lock = threading.Lock()
+
+    def add(self, stage: str, duration: float, target: Optional[Path] = None, **fields):
+        """Record one finished stage"""
+        entry = {'stage': stage, 'target': str(target) if target else None, 'duration_s': round(duration, 3), **fields}
+        with self.lock:
+            self.stages.append(entry)
+
+    @contextmanager
+    def stage(self, stage: str, target: Optional[Path] = None):
+        """Time a block; the yielded dict collects extra fields for the record"""
+        fields: Dict[str, object] = {}
+        started = time.monotonic()
+        try:
+            yield fields
+        finally:
+            self.add(stage, time.monotonic() - started, target, **fields)
+
+    def write(self, history_path: Path, status: str):
+        """Append this sync to the history file"""
+        record = {
+            'timestamp': self.started_at.isoformat(timespec='seconds'),
+            'version': self.version,
+            'status': status,
+            'duration_s': round(time.monotonic() - self.started, 3),
+            'stages': self.stages,
+        }
+        with open(history_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def print_report(history_path: Path, last: Optional[int] = None):
+    """Print p50/p95 per stage (and target) over the recorded syncs"""
+    if not history_path.exists():
+        print(f"⚠️ No sync history at {history_path}")
+        return
+
+    records = []
+    with open(history_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    if last:
+        records = records[-last:]
+    if not records:
+        print(f"⚠️ No syncs recorded in {history_path}")
+        return
+
+    statuses: Dict[str, int] = {}
+    for record in records:
+        statuses[record.get('status', '?')] = statuses.get(record.get('status', '?'), 0) + 1
+    print(f"📈 {len(records)} sync(s) in {history_path} ({', '.join(f'{n} {s}' for s, n in sorted(statuses.items()))})\n")
+
+    # (stage, target) -> durations of runs that did work, runs skipped by the cache, failures
+    rows: Dict[Tuple[str, str], Dict[str, list]] = {}
+
+    def row(stage: str, target: Optional[str]) -> Dict[str, list]:
+        return rows.setdefault((stage, target or '-'), {'durations': [], 'skipped': [], 'failures': []})
+
+    for record in records:
+        sync_row = row('sync', None)
+        sync_row['durations'].append(record['duration_s'])
+        if record.get('status') != 'ok':
+            sync_row['failures'].append(record)
+        for entry in record.get('stages', []):
+            stage_row = row(entry['stage'], entry.get('target'))
+            if entry.get('skipped'):
+                stage_row['skipped'].append(entry)
+                continue
+            stage_row['durations'].append(entry['duration_s'])
+            if entry.get('exit_code') not in (None, 0) or entry.get('ok') is False or entry.get('status', 'ok') != 'ok':
+                stage_row['failures'].append(entry)
+
+    stage_width = max(len(stage) for stage, _ in rows)
+    target_width = max(len(target) for _, target in rows)
+    print(f"  {'stage':<{stage_width}}  {'target':<{target_width}}  {'runs':>5}  {'cached':>6}  {'p50':>8}  {'p95':>8}  {'max':>8}  {'fails':>5}")
+    for (stage, target), data in sorted(rows.items(), key=lambda item: (REPORT_STAGE_ORDER.get(item[0][0], len(REPORT_STAGE_ORDER)), item[0])):
+        durations = data['durations']
+        timings = [f"{percentile(durations, 50):7.2f}s", f"{percentile(durations, 95):7.2f}s", f"{max(durations):7.2f}s"] if durations else ['-'] * 3
+        print(
+            f"  {stage:<{stage_width}}  {target:<{target_width}}  {len(durations):>5}  {len(data['skipped']):>6}  "
+            f"{timings[0]:>8}  {timings[1]:>8}  {timings[2]:>8}  {len(data['failures']):>5}"
+        )
+
+
+BUILD_CACHE_NAME = '.watch_package_cache.json'
+BUILD_INPUTS = ['src', 'tsconfig.json']
+
+
+def compute_build_hash(work_dir: Path, version: str, salt: str = '') -> str:
+    """Hash of everything tsc reads (src/, tsconfig.json) plus the package version and any extra inputs in salt"""
+    digest = hashlib.sha256(f"version:{version}\nsalt:{salt}\n".encode())
+    for name in BUILD_INPUTS:
+        root = work_dir / name
+        files = sorted(p for p in root.rglob('*') if p.is_file()) if root.is_dir() else [root] if root.exists() else []
+        for file in files:
+            digest.update(file.relative_to(work_dir).as_posix().encode() + b'\0')
+            digest.update(file.read_bytes())
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def terminate_process_tree(process: subprocess.Popen):
+    """Stop a command started by PackageWatcher._run along with everything it spawned"""
+    try:
+        if sys.platform == 'win32':
+            process.terminate()
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def create_backend(kind: str, path: Path, interval: float):
+    """Pick the watch backend; 'auto' prefers inotify and falls back to polling"""
+    if kind in ('auto', 'inotify'):
+        try:
+            return InotifyBackend(path)
+        except (OSError, AttributeError) as e:
+            if kind == 'inotify':
+                raise
+            print(f"⚠️ inotify unavailable ({e}), falling back to polling")
+    return PollBackend(path, interval)
+
+
 class PackageWatcher:
     def __init__(
         self,
@@ -22,13 +255,31 @@ class PackageWatcher:
         dependency_name: str,
         target_package_jsons: List[str],
         npm_token: Optional[str] = None,
-        poll_interval: int = 5
+        poll_interval: int = 5,
+        backend: str = 'auto',
+        jobs: Optional[int] = None,
+        debounce: float = 1.0,
+        link: bool = False,
+        history_path: Optional[str] = DEFAULT_HISTORY_PATH
     ):
         self.watch_path = Path(watch_package_json)
         self.dependency_name = dependency_name
         self.target_paths = [Path(p) for p in target_package_jsons]
         self.poll_interval = poll_interval
+        self.backend_kind = backend
+        self.jobs = max(1, jobs or len(self.target_paths))
+        self.debounce = debounce
+        self.link = link
+        self.history_path = Path(history_path) if history_path else None
+        self.recorder: Optional[SyncRecorder] = None
+
+        # The running sync, and the subprocesses cancel_sync() has to kill to stop it
+        self.sync_thread: Optional[threading.Thread] = None
+        self.cancel_event = threading.Event()
+        self.process_lock = threading.Lock()
+        self.processes = set()
         self.last_version = None
+        self.last_stat = None
 
         # Validate paths
         if not self.watch_path.exists():
@@ -62,6 +313,14 @@ class PackageWatcher:
             print(f"⚠️ Error reading {npmrc_path}: {e}")
             return None
 
+    def _stat(self, path: Path) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of a file, or None if it can't be read"""
+        try:
+            st = path.stat()
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
     def get_dependency_version(self, package_json_path: Path) -> Optional[str]:
         """Get the version of the watched dependency from package.json"""
         try:
@@ -92,7 +351,7 @@ class PackageWatcher:
             return 'file:../packages/client'
         return new_version
 
-    def update_dependency_version(self, package_json_path: Path, new_version: str) -> bool:
+    def update_dependency_version(self, package_json_path: Path, new_version: str, log: Callable[[str], None] = print) -> bool:
         """Update the dependency version in a package.json file"""
         try:
             with open(package_json_path, 'r', encoding='utf-8') as f:
@@ -121,54 +380,149 @@ class PackageWatcher:
 
             return False
         except Exception as e:
-            print(f"❌ Error updating {package_json_path}: {e}")
+            log(f"❌ Error updating {package_json_path}: {e}")
             return False
 
-    def run_npm_build(self, package_json_path: Path) -> bool:
-        """Compile and publish the watched package."""
-        import os
+    def _record(self, stage: str, duration: float, target: Optional[Path] = None, **fields):
+        """Add a stage to the running sync's record, if there is one"""
+        if self.recorder is not None:
+            self.recorder.add(stage, duration, target, **fields)
 
-        try:
-            work_dir = package_json_path.parent
-            print(f"📦 Running npm run build in {work_dir}")
+    def _stage(self, stage: str, target: Optional[Path] = None):
+        """Time a block into the running sync's record, if there is one"""
+        return self.recorder.stage(stage, target) if self.recorder is not None else nullcontext({})
 
-            build_result = subprocess.run(
-                ['npm', 'run', 'build'],
-                cwd=work_dir,
-                capture_output=True,
+    def _run(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        env: Optional[dict] = None,
+        stage: Optional[str] = None,
+        target: Optional[Path] = None
+    ) -> subprocess.CompletedProcess:
+        """Run a command to completion unless the sync is cancelled meanwhile, recording it as a stage"""
+        started = time.monotonic()
+        with self.process_lock:
+            if self.cancel_event.is_set():
+                raise SyncCancelled()
+            process = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
+                env=env,
                 shell=True if sys.platform == 'win32' else False,
+                # Own process group, so cancelling also stops the node processes npm starts
+                start_new_session=sys.platform != 'win32',
             )
+            self.processes.add(process)
 
-            if build_result.returncode != 0:
-                print(f"❌ Build failed:\n{build_result.stderr}")
-                return False
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self.process_lock:
+                self.processes.discard(process)
 
-            print(f"📤 Publishing package from {work_dir}")
-            publish_result = subprocess.run(
-                ['npm', 'run', 'publish:package'],
-                cwd=work_dir,
-                capture_output=True,
-                text=True,
-                shell=True if sys.platform == 'win32' else False,
-                env=os.environ.copy(),
+        cancelled = self.cancel_event.is_set()
+        if stage:
+            self._record(
+                stage,
+                time.monotonic() - started,
+                target,
+                exit_code=process.returncode,
+                stdout_bytes=len((stdout or '').encode()),
+                stderr_bytes=len((stderr or '').encode()),
+                **({'cancelled': True} if cancelled else {}),
             )
+        if cancelled:
+            raise SyncCancelled()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _load_build_cache(self, work_dir: Path) -> dict:
+        """Last built hash and published versions of the watched package"""
+        try:
+            with open(work_dir / BUILD_CACHE_NAME, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_build_cache(self, work_dir: Path, cache: dict):
+        """Write the build cache atomically"""
+        cache_path = work_dir / BUILD_CACHE_NAME
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, cache_path)
+
+    def run_npm_build(
+        self,
+        package_json_path: Path,
+        publish: bool = True,
+        log: Callable[[str], None] = print,
+        salt: str = ''
+    ) -> bool:
+        """Compile and publish the watched package, skipping whatever is already done."""
+        import os
+
+        try:
+            work_dir = package_json_path.parent
+            with open(package_json_path, 'r', encoding='utf-8') as f:
+                version = json.load(f).get('version', '')
+
+            cache = self._load_build_cache(work_dir)
+            published = cache.setdefault('published', {})
+            build_hash = compute_build_hash(work_dir, version, salt)
+
+            if cache.get('build_hash') == build_hash and (work_dir / 'dist').is_dir():
+                log(f"⚡ dist/ is up to date for {version} ({build_hash[:12]}), skipping build")
+                self._record('build', 0.0, package_json_path, skipped=True)
+            else:
+                log(f"📦 Running npm run build in {work_dir}")
+
+                build_result = self._run(['npm', 'run', 'build'], work_dir, stage='build', target=package_json_path)
+
+                if build_result.returncode != 0:
+                    log(f"❌ Build failed:\n{build_result.stderr}")
+                    return False
+
+                cache['build_hash'] = build_hash
+                self._save_build_cache(work_dir, cache)
+
+            if not publish:
+                log("✅ Build successful (not publishing)")
+                return True
+
+            if version in published:
+                log(f"⚡ {version} is already published, skipping publish")
+                self._record('publish', 0.0, package_json_path, skipped=True)
+                return True
+
+            log(f"📤 Publishing package from {work_dir}")
+            # dist/ was just verified against the source hash, so skip prepublishOnly's second build
+            publish_result = self._run(['npm', 'run', 'publish:package', '--', '--ignore-scripts'], work_dir, os.environ.copy(), stage='publish', target=package_json_path)
 
             if publish_result.returncode == 0:
-                print("✅ Build and publish successful")
+                published[version] = build_hash
+                self._save_build_cache(work_dir, cache)
+                log("✅ Build and publish successful")
                 return True
 
-            print(f"❌ Publish failed:\n{publish_result.stderr}")
+            log(f"❌ Publish failed:\n{publish_result.stderr}")
             return False
+        except SyncCancelled:
+            raise
         except Exception as e:
-            print(f"❌ Error running build: {e}")
+            log(f"❌ Error running build: {e}")
             return False
 
-    def run_npm_install(self, package_json_path: Path) -> bool:
+    def run_npm_install(self, package_json_path: Path, log: Callable[[str], None] = print) -> bool:
         """Run npm install with .npmrc configuration"""
         try:
             work_dir = package_json_path.parent
-            print(f"📥 Running npm install in {work_dir}")
+            log(f"📥 Running npm install in {work_dir}")
 
             import os
             import shutil
@@ -184,85 +538,650 @@ class PackageWatcher:
                     with open(target_npmrc, 'r') as f:
                         content = f.read()
 
-            result = subprocess.run(
-                ['npm', 'install'],
-                cwd=work_dir,
-                capture_output=True,
-                text=True,
-                env=env,
-                shell=True if sys.platform == 'win32' else False
-            )
+            result = self._run(['npm', 'install'], work_dir, env, stage='install', target=package_json_path)
 
             if result.returncode == 0:
-                print(f"✅ npm install successful")
+                log(f"✅ npm install successful")
                 return True
             else:
-                print(f"❌ npm install failed:\n{result.stderr}")
+                log(f"❌ npm install failed:\n{result.stderr}")
+                return False
+        except SyncCancelled:
+            raise
+        except Exception as e:
+            log(f"❌ Error running npm install: {e}")
+            return False
+
+    def update_lockfile_entry(self, target_dir: Path, new_version: str, dependency_spec: str) -> bool:
+        """Point the lockfile at the linked build: new version, no registry tarball"""
+        lock_path = target_dir / 'package-lock.json'
+        if not lock_path.exists():
+            return False
+
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            lock = json.load(f)
+
+        packages = lock.get('packages', {})
+        entry = packages.get(f'node_modules/{self.dependency_name}')
+        if entry is None or entry.get('link'):
+            return False
+
+        entry['version'] = new_version
+        # The copied files don't come from a registry tarball, so its URL and checksum no longer apply
+        entry.pop('resolved', None)
+        entry.pop('integrity', None)
+
+        root = packages.get('', {})
+        for section in ('dependencies', 'devDependencies'):
+            if self.dependency_name in root.get(section, {}):
+                root[section][self.dependency_name] = dependency_spec
+
+        tmp_path = lock_path.with_name(lock_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(lock, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, lock_path)
+        return True
+
+    def link_into_target(self, target_path: Path, new_version: str, log: Callable[[str], None] = print) -> bool:
+        """Copy the built dist/ and package.json straight into the target's node_modules"""
+        try:
+            source_dir = self.watch_path.parent
+            target_dir = target_path.parent
+            installed_dir = target_dir / 'node_modules' / Path(*self.dependency_name.split('/'))
+
+            # A file: dependency is a symlink to the package itself, so it already sees the new build
+            if installed_dir.is_symlink():
+                log(f"🔗 {installed_dir} links to the package source, nothing to copy")
+                return True
+
+            if not (source_dir / 'dist').is_dir():
+                log(f"❌ {source_dir / 'dist'} not found, nothing to copy")
                 return False
+
+            log(f"📋 Copying dist/ into {installed_dir}")
+            installed_dir.mkdir(parents=True, exist_ok=True)
+            # Copy next to the old dist/ and swap, so the target never sees a half-copied package
+            staging_dir = installed_dir / 'dist.tmp'
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir)
+            shutil.copytree(source_dir / 'dist', staging_dir)
+            if (installed_dir / 'dist').exists():
+                shutil.rmtree(installed_dir / 'dist')
+            os.replace(staging_dir, installed_dir / 'dist')
+            shutil.copy2(source_dir / 'package.json', installed_dir / 'package.json')
+
+            dependency_spec = self.resolve_dependency_spec(target_path, new_version)
+            if self.update_lockfile_entry(target_dir, new_version, dependency_spec):
+                log(f"🔒 Updated {self.dependency_name} in {target_dir / 'package-lock.json'}")
+
+            log(f"✅ Linked {self.dependency_name}@{new_version}")
+            return True
         except Exception as e:
-            print(f"❌ Error running npm install: {e}")
+            log(f"❌ Error linking into {target_dir}: {e}")
             return False
 
+    def sync_target(self, target_path: Path, new_version: str) -> Tuple[str, float, List[str]]:
+        """Update and install one target, returning (status, seconds, captured output)"""
+        started = time.monotonic()
+        lines: List[str] = []
+        log = lines.append
+
+        with self._stage('manifest', target_path) as fields:
+            fields['ok'] = self.update_dependency_version(target_path, new_version, log)
+        if not fields['ok']:
+            log(f"⚠️ Could not update (dependency not found in this file)")
+            return 'not updated', time.monotonic() - started, lines
+
+        log(f"✅ Updated {self.dependency_name} to {new_version}")
+        if self.link:
+            with self._stage('link', target_path) as fields:
+                fields['ok'] = self.link_into_target(target_path, new_version, log)
+            if not fields['ok']:
+                return 'link failed', time.monotonic() - started, lines
+            return 'ok', time.monotonic() - started, lines
+
+        try:
+            if not self.run_npm_install(target_path, log):
+                return 'install failed', time.monotonic() - started, lines
+        except SyncCancelled:
+            log(f"🛑 Cancelled")
+            return 'cancelled', time.monotonic() - started, lines
+        return 'ok', time.monotonic() - started, lines
+
+    @staticmethod
+    def print_summary(results: List[Tuple[Path, str, float]]):
+        """Print a per-target status/duration table"""
+        width = max(len(str(path)) for path, _, _ in results)
+        print(f"\n📊 Summary")
+        for path, status, duration in results:
+            icon = '✅' if status == 'ok' else '❌'
+            print(f"  {icon} {str(path):<{width}}  {status:<14}  {duration:6.1f}s")
+
     def handle_version_change(self, new_version: str):
         """Handle when a version change is detected"""
+        self.recorder = SyncRecorder(new_version)
+        status = 'error'
+        try:
+            status = self._sync(new_version)
+        finally:
+            if self.history_path is not None:
+                try:
+                    self.recorder.write(self.history_path, status)
+                except OSError as e:
+                    print(f"⚠️ Could not write sync history to {self.history_path}: {e}")
+            self.recorder = None
+
+    def _sync(self, new_version: str) -> str:
+        """Build, then update every target; returns the sync's status"""
         print(f"\n🔔 Version change detected: {self.dependency_name} → {new_version}")
 
         # Step 1: Build the watched package
         print(f"\n📦 Step 1: Building {self.watch_path}")
-        if not self.run_npm_build(self.watch_path):
+        try:
+            built = self.run_npm_build(self.watch_path, publish=not self.link)
+        except SyncCancelled:
+            print(f"🛑 Sync for {new_version} cancelled")
+            return 'cancelled'
+        if not built:
             print("⚠️ Build failed, stopping sync process")
             print(f"\n❌ Sync failed!\n")
-            return
+            return 'build failed'
 
-        # Step 2: Update all target package.json files
-        print(f"\n📝 Step 2: Updating target package.json files")
+        # Step 2: Update every target package.json and run npm install in it, several targets at once
+        print(f"\n📝 Step 2: Updating and installing {len(self.target_paths)} target(s), {self.jobs} at a time")
 
-        all_success = True
-        for target_path in self.target_paths:
-            print(f"\n  → Updating {target_path}")
-            if self.update_dependency_version(target_path, new_version):
-                print(f"    ✅ Updated {self.dependency_name} to {new_version}")
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(self.sync_target, target_path, new_version): target_path for target_path in self.target_paths}
+            for future in as_completed(futures):
+                target_path = futures[future]
+                try:
+                    status, duration, lines = future.result()
+                except Exception as e:
+                    status, duration, lines = 'error', 0.0, [f"❌ {e}"]
+                results[target_path] = (status, duration)
+                self._record('target', duration, target_path, status=status)
 
-                # Step 3: Run npm install
-                if not self.run_npm_install(target_path):
-                    all_success = False
-                    print(f"    ❌ Failed to install dependencies for {target_path}")
-            else:
-                print(f"    ⚠️ Could not update (dependency not found in this file)")
-                all_success = False
+                # Each target's output is printed in one piece when it finishes, so targets don't interleave
+                print(f"\n  → {target_path} ({duration:.1f}s)")
+                for line in lines:
+                    for part in line.splitlines():
+                        print(f"    {part}")
+
+        if self.cancel_event.is_set():
+            print(f"🛑 Sync for {new_version} cancelled")
+            return 'cancelled'
+
+        self.print_summary([(path, *results[path]) for path in self.target_paths])
+        all_success = all(status == 'ok' for status, _ in results.values())
 
         if all_success:
             print(f"\n✨ Sync complete!\n")
-        else:
-            print(f"\n⚠️ Sync completed with errors!\n")
+            return 'ok'
+        print(f"\n⚠️ Sync completed with errors!\n")
+        return 'failed'
+
+    def sync_running(self) -> bool:
+        """Whether a sync is still in progress"""
+        return self.sync_thread is not None and self.sync_thread.is_alive()
+
+    def start_sync(self, new_version: str):
+        """Run handle_version_change in the background so the watch loop stays responsive"""
+        self.cancel_event.clear()
+        self.sync_thread = threading.Thread(target=self.handle_version_change, args=(new_version,), daemon=True)
+        self.sync_thread.start()
+
+    def cancel_sync(self):
+        """Kill the running sync's subprocesses and wait for it to unwind"""
+        if not self.sync_running():
+            return
+        with self.process_lock:
+            self.cancel_event.set()
+            for process in self.processes:
+                terminate_process_tree(process)
+        self.sync_thread.join()
 
     def watch(self):
         """Start watching for version changes"""
         print(f"👀 Watching {self.watch_path}")
         print(f"📦 Dependency: {self.dependency_name}")
         print(f"🎯 Targets: {len(self.target_paths)} package.json file(s)")
-        print(f"⏱️  Checking every {self.poll_interval} seconds")
+
+        backend = create_backend(self.backend_kind, self.watch_path, self.poll_interval)
+        if backend.name == 'poll':
+            print(f"⏱️  Checking every {self.poll_interval} seconds")
+        else:
+            print(f"⚡ Reacting to file events ({backend.name})")
         print(f"{'='*60}\n")
 
         # Get initial version
+        self.last_stat = self._stat(self.watch_path)
         self.last_version = self.get_dependency_version(self.watch_path)
         if self.last_version:
             print(f"📌 Current version: {self.last_version}\n")
         else:
             print(f"⚠️ Dependency '{self.dependency_name}' not found in {self.watch_path}\n")
 
+        # A new version waits out the debounce window before its sync starts, so a burst of bumps costs one sync
+        pending_version = None
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                # Only re-parse when the file actually changed
+                if backend.wait(timeout):
+                    current_stat = self._stat(self.watch_path)
+                    if current_stat is not None and current_stat != self.last_stat:
+                        self.last_stat = current_stat
+                        current_version = self.get_dependency_version(self.watch_path)
+
+                        if current_version and current_version != (pending_version or self.last_version):
+                            if self.sync_running():
+                                print(f"\n🛑 {current_version} supersedes {self.last_version}, cancelling the running sync")
+                                self.cancel_sync()
+                            pending_version = current_version
+                            deadline = time.monotonic() + self.debounce
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.start_sync(pending_version)
+                    self.last_version = pending_version
+                    pending_version = deadline = None
+
+        except KeyboardInterrupt:
+            print(f"\n\n👋 Stopping watcher...")
+            self.cancel_sync()
+            sys.exit(0)
+        finally:
+            backend.close()
+
+
+class WorkspacePackage:
+    """One package.json listed in a --config workspace"""
+
+    def __init__(self, base_dir: Path, spec: dict):
+        self.key = spec['path']
+        path = base_dir / spec['path']
+        self.package_json = path if path.name == 'package.json' else path / 'package.json'
+        if not self.package_json.exists():
+            raise FileNotFoundError(f"package.json not found for workspace package {self.key}: {self.package_json}")
+
+        self.build = spec.get('build')
+        self.publish = spec.get('publish', False)
+        self.depends_on = list(spec.get('depends_on', []))
+        self.last_stat = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read name, version and dependencies; returns whether the dependency names changed"""
+        with open(self.package_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        old_deps = set(getattr(self, 'deps', {}))
+        self.name = data.get('name', self.key)
+        self.version = data.get('version')
+        self.deps = {**data.get('devDependencies', {}), **data.get('dependencies', {})}
+        return set(self.deps) != old_deps
+
+
+def load_workspace_config(config_path: Path) -> List[WorkspacePackage]:
+    """Read the --config file; package paths are relative to it"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    packages = [WorkspacePackage(config_path.parent, spec) for spec in config.get('packages', [])]
+    if not packages:
+        raise ValueError(f"No packages listed in {config_path}")
+    return packages
+
+
+def build_dependency_graph(packages: List[WorkspacePackage]) -> Dict[str, List[str]]:
+    """Map each package key to the keys of the workspace packages it depends on"""
+    by_name: Dict[str, List[str]] = {}
+    published: Dict[str, List[str]] = {}
+    for package in packages:
+        by_name.setdefault(package.name, []).append(package.key)
+        if package.publish:
+            published.setdefault(package.name, []).append(package.key)
+
+    for name, keys_with_name in published.items():
+        if len(keys_with_name) > 1:
+            raise ValueError(f"{', '.join(keys_with_name)} would all be published as {name}")
+
+    keys = {package.key for package in packages}
+    upstream: Dict[str, List[str]] = {}
+    for package in packages:
+        deps = []
+        for name in package.deps:
+            candidates = [key for key in by_name.get(name, []) if key != package.key]
+            if len(candidates) > 1:
+                # Two workspace packages share the npm name; depends_on says which one this package really uses
+                candidates = [key for key in candidates if key in package.depends_on]
+                if not candidates:
+                    raise ValueError(
+                        f"{package.key} depends on {name}, which is the name of {', '.join(by_name[name])}; "
+                        f"list the one it uses in depends_on"
+                    )
+            deps.extend(candidates)
+        for key in package.depends_on:
+            if key not in keys:
+                raise ValueError(f"{package.key} depends_on unknown package {key}")
+            deps.append(key)
+        upstream[package.key] = sorted(set(deps))
+    return upstream
+
+
+def topological_order(upstream: Dict[str, List[str]]) -> List[str]:
+    """Kahn's algorithm; config order breaks ties so the order is stable"""
+    remaining = {key: set(deps) for key, deps in upstream.items()}
+    order = []
+    while remaining:
+        ready = [key for key, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        for key in ready:
+            del remaining[key]
+            order.append(key)
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+class WorkspaceGraph:
+    """Immutable snapshot of the workspace's edges and build order; a cyclic graph is rejected before anything is built"""
+
+    def __init__(self, packages: List[WorkspacePackage]):
+        upstream = build_dependency_graph(packages)
+        downstream: Dict[str, List[str]] = {package.key: [] for package in packages}
+        for key, deps in upstream.items():
+            for dep in deps:
+                downstream[dep].append(key)
+        order = topological_order(upstream)
+
+        self.upstream = upstream
+        self.downstream = downstream
+        self.order = order
+
+    def affected(self, changed: Set[str]) -> Set[str]:
+        """The changed packages plus everything downstream of them"""
+        result = set()
+        stack = list(changed)
+        while stack:
+            key = stack.pop()
+            if key not in result:
+                result.add(key)
+                stack.extend(self.downstream[key])
+        return result
+
+
+class WorkspaceDaemon:
+    """Watches every package in a workspace config and rebuilds what a version change affects, in dependency order"""
+
+    def __init__(
+        self,
+        config_path: str,
+        poll_interval: int = 5,
+        backend: str = 'auto',
+        jobs: Optional[int] = None,
+        debounce: float = 1.0,
+        link: bool = False,
+        history_path: Optional[str] = DEFAULT_HISTORY_PATH
+    ):
+        self.config_path = Path(config_path)
+        self.packages = {package.key: package for package in load_workspace_config(self.config_path)}
+        self.poll_interval = poll_interval
+        self.backend_kind = backend
+        self.debounce = debounce
+        self.link = link
+        self.history_path = Path(history_path) if history_path else None
+        # Replaced as a whole, never mutated, so a running sync keeps a consistent snapshot
+        self.graph = WorkspaceGraph(list(self.packages.values()))
+        self.jobs = max(1, jobs or len(self.packages))
+
+        self.sync_thread: Optional[threading.Thread] = None
+        self.cancel_event = threading.Event()
+        self.process_lock = threading.Lock()
+        self.processes = set()
+
+        # A PackageWatcher per package does the actual build/publish/install/link work;
+        # they all share one cancellation switch so a newer change can stop the whole sync
+        self.workers: Dict[str, PackageWatcher] = {}
+        for key, package in self.packages.items():
+            worker = PackageWatcher(str(package.package_json), package.name, [], history_path=None, link=link)
+            worker.cancel_event = self.cancel_event
+            worker.process_lock = self.process_lock
+            worker.processes = self.processes
+            self.workers[key] = worker
+
+    def should_build(self, key: str, graph: WorkspaceGraph) -> bool:
+        """Libraries other packages depend on build by default; apps only when the config says so"""
+        package = self.packages[key]
+        return package.build if package.build is not None else bool(graph.downstream[key])
+
+    def update_dependency_specs(self, package: WorkspacePackage, upstream: List[WorkspacePackage], log: Callable[[str], None]) -> List[str]:
+        """Point package.json at the upstream packages' new versions; file:/link:/workspace: specs are left alone"""
+        with open(package.package_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        changed = []
+        for dep in upstream:
+            for section in ('dependencies', 'devDependencies'):
+                spec = data.get(section, {}).get(dep.name)
+                if spec is None or spec.startswith(('file:', 'link:', 'workspace:')) or spec == dep.version:
+                    continue
+                data[section][dep.name] = dep.version
+                changed.append(dep.name)
+                log(f"✅ Updated {dep.name} to {dep.version}")
+
+        if changed:
+            with open(package.package_json, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.write('\n')  # Add trailing newline
+        return changed
+
+    def process_package(self, key: str, affected: Set[str], graph: WorkspaceGraph) -> Tuple[str, float, List[str]]:
+        """Bring one package up to date with its changed upstreams, then build/publish it"""
+        started = time.monotonic()
+        lines: List[str] = []
+        log = lines.append
+        package = self.packages[key]
+        worker = self.workers[key]
+
+        try:
+            upstream = [self.packages[dep] for dep in graph.upstream[key] if dep in affected and self.packages[dep].name in package.deps]
+            if upstream:
+                with worker._stage('manifest', package.package_json) as fields:
+                    changed = self.update_dependency_specs(package, upstream, log)
+                    fields['changed'] = len(changed)
+
+                if self.link:
+                    for dep in upstream:
+                        with worker._stage('link', package.package_json) as fields:
+                            fields['ok'] = self.workers[dep.key].link_into_target(package.package_json, dep.version, log)
+                        if not fields['ok']:
+                            return 'link failed', time.monotonic() - started, lines
+                elif changed:
+                    # The upstream's .npmrc carries the registry token its consumers install with
+                    if not self.workers[upstream[0].key].run_npm_install(package.package_json, log):
+                        return 'install failed', time.monotonic() - started, lines
+                else:
+                    log(f"🔗 Dependency specs already up to date (or file: links), nothing to install")
+
+            if self.should_build(key, graph):
+                # Upstream versions are build inputs too, so a new upstream invalidates the cached build
+                salt = ','.join(f"{self.packages[dep].name}@{self.packages[dep].version}" for dep in graph.upstream[key])
+                if not worker.run_npm_build(package.package_json, publish=package.publish and not self.link, log=log, salt=salt):
+                    return 'build failed', time.monotonic() - started, lines
+        except SyncCancelled:
+            log(f"🛑 Cancelled")
+            return 'cancelled', time.monotonic() - started, lines
+        return 'ok', time.monotonic() - started, lines
+
+    def handle_changes(self, changed: Set[str], graph: WorkspaceGraph):
+        """Run one sync for a set of changed packages and record it"""
+        recorder = SyncRecorder(', '.join(f"{self.packages[key].name}@{self.packages[key].version}" for key in sorted(changed)))
+        for worker in self.workers.values():
+            worker.recorder = recorder
+        status = 'error'
+        try:
+            status = self._sync(changed, graph)
+        finally:
+            if self.history_path is not None:
+                try:
+                    recorder.write(self.history_path, status)
+                except OSError as e:
+                    print(f"⚠️ Could not write sync history to {self.history_path}: {e}")
+            for worker in self.workers.values():
+                worker.recorder = None
+
+    def _sync(self, changed: Set[str], graph: WorkspaceGraph) -> str:
+        """Process the affected packages in topological order, independent ones in parallel"""
+        affected = graph.affected(changed)
+        print(f"\n🔔 Changed: {', '.join(f'{self.packages[key].name}@{self.packages[key].version}' for key in sorted(changed))}")
+        print(f"🧭 Affected: {', '.join(key for key in graph.order if key in affected)}, {self.jobs} at a time")
+
+        waiting = {key: {dep for dep in graph.upstream[key] if dep in affected} for key in graph.order if key in affected}
+        results: Dict[str, Tuple[str, float]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while waiting or running:
+                for key in [key for key, deps in waiting.items() if not deps]:
+                    del waiting[key]
+                    failed = [dep for dep in graph.upstream[key] if dep in results and results[dep][0] != 'ok']
+                    if failed or self.cancel_event.is_set():
+                        # Skipped packages count as finished so their own dependents get skipped in turn
+                        results[key] = ('skipped', 0.0)
+                        print(f"\n  ⏭️  {key} skipped" + (f" ({', '.join(f'{dep} {results[dep][0]}' for dep in failed)})" if failed else ""))
+                        for deps in waiting.values():
+                            deps.discard(key)
+                        continue
+                    running[pool.submit(self.process_package, key, affected, graph)] = key
+
+                if not running:
+                    if waiting:
+                        # Can't happen with a graph topological_order accepted, but never spin on one that slipped through
+                        print(f"❌ No package can start: {', '.join(sorted(waiting))} wait on each other")
+                        return 'failed'
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    try:
+                        status, duration, lines = future.result()
+                    except Exception as e:
+                        status, duration, lines = 'error', 0.0, [f"❌ {e}"]
+                    results[key] = (status, duration)
+                    self.workers[key]._record('target', duration, self.packages[key].package_json, status=status)
+                    for deps in waiting.values():
+                        deps.discard(key)
+
+                    print(f"\n  → {key} ({duration:.1f}s)")
+                    for line in lines:
+                        for part in line.splitlines():
+                            print(f"    {part}")
+
+        if self.cancel_event.is_set():
+            print(f"🛑 Sync cancelled")
+            return 'cancelled'
+
+        PackageWatcher.print_summary([(Path(key), *results[key]) for key in graph.order if key in results])
+        if all(status == 'ok' for status, _ in results.values()):
+            print(f"\n✨ Sync complete!\n")
+            return 'ok'
+        print(f"\n⚠️ Sync completed with errors!\n")
+        return 'failed'
+
+    def sync_running(self) -> bool:
+        """Whether a sync is still in progress"""
+        return self.sync_thread is not None and self.sync_thread.is_alive()
+
+    def start_sync(self, changed: Set[str]):
+        """Run handle_changes in the background so the watch loop stays responsive"""
+        self.cancel_event.clear()
+        self.sync_thread = threading.Thread(target=self.handle_changes, args=(changed, self.graph), daemon=True)
+        self.sync_thread.start()
+
+    def cancel_sync(self):
+        """Kill the running sync's subprocesses and wait for it to unwind"""
+        if not self.sync_running():
+            return
+        with self.process_lock:
+            self.cancel_event.set()
+            for process in self.processes:
+                terminate_process_tree(process)
+        self.sync_thread.join()
+
+    def _forward_events(self, key: str, backend, events: 'queue.Queue[str]'):
+        """Feed one package's file events into the shared queue"""
+        while True:
+            if backend.wait():
+                events.put(key)
+
+    def watch(self):
+        """Start watching every package in the workspace"""
+        print(f"👀 Watching {len(self.packages)} package(s) from {self.config_path}")
+        for key in self.graph.order:
+            deps = ', '.join(self.graph.upstream[key]) or '-'
+            print(f"  📦 {self.packages[key].name}@{self.packages[key].version} ({key}) ← {deps}")
+        print(f"{'='*60}\n")
+
+        events: 'queue.Queue[str]' = queue.Queue()
+        for key, package in self.packages.items():
+            package.last_stat = self.workers[key]._stat(package.package_json)
+            backend = create_backend(self.backend_kind, package.package_json, self.poll_interval)
+            threading.Thread(target=self._forward_events, args=(key, backend, events), daemon=True).start()
+
+        # Same debounce/cancel rules as the single-package watcher; a cancelled sync's packages are carried over
+        pending: Set[str] = set()
+        in_flight: Set[str] = set()
+        deadline = None
         try:
             while True:
-                time.sleep(self.poll_interval)
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    keys = {events.get(timeout=timeout)}
+                    while not events.empty():
+                        keys.add(events.get_nowait())
+                except queue.Empty:
+                    keys = set()
+
+                for key in keys:
+                    package = self.packages[key]
+                    # Only re-parse when the file actually changed
+                    current_stat = self.workers[key]._stat(package.package_json)
+                    if current_stat is None or current_stat == package.last_stat:
+                        continue
+                    package.last_stat = current_stat
+
+                    previous_version = package.version
+                    try:
+                        deps_changed = package.reload()
+                    except (OSError, ValueError) as e:
+                        print(f"❌ Error reading {package.package_json}: {e}")
+                        continue
+                    if deps_changed:
+                        try:
+                            self.graph = WorkspaceGraph(list(self.packages.values()))
+                        except ValueError as e:
+                            print(f"❌ {e}; keeping the previous dependency graph")
+                    if package.version == previous_version:
+                        continue
 
-                current_version = self.get_dependency_version(self.watch_path)
+                    print(f"\n⏳ {package.name} {previous_version} → {package.version}")
+                    if self.sync_running():
+                        print(f"🛑 Cancelling the running sync, it will be redone with this change")
+                        self.cancel_sync()
+                        pending |= in_flight
+                    pending.add(key)
+                    deadline = time.monotonic() + self.debounce
 
-                if current_version and current_version != self.last_version:
-                    self.handle_version_change(current_version)
-                    self.last_version = current_version
+                if deadline is not None and time.monotonic() >= deadline:
+                    in_flight, pending, deadline = pending, set(), None
+                    self.start_sync(in_flight)
 
         except KeyboardInterrupt:
             print(f"\n\n👋 Stopping watcher...")
+            self.cancel_sync()
             sys.exit(0)
 
 
@@ -285,28 +1204,36 @@ Examples:
     --dependency my-package \\
     --targets ../app1/package.json ../app2/package.json \\
     --token "your-npm-token"
+
+  # Watch a whole workspace and rebuild downstream packages in dependency order
+  python watch_package.py --config watch_package.config.json --jobs 3
+
+  # Where does sync time go? p50/p95 per stage over the recorded syncs
+  python watch_package.py --report
         '''
     )
 
     parser.add_argument(
         '--watch',
-        required=True,
         help='Path to package.json to watch'
     )
 
     parser.add_argument(
         '--dependency',
-        required=True,
         help='Name of the dependency to watch'
     )
 
     parser.add_argument(
         '--targets',
         nargs='+',
-        required=True,
         help='Paths to target package.json files to update'
     )
 
+    parser.add_argument(
+        '--config',
+        help='Workspace config listing many packages to watch; replaces --watch/--dependency/--targets'
+    )
+
     parser.add_argument(
         '--token',
         help='NPM token (will try to read from .npmrc in watch directory if not provided)'
@@ -316,11 +1243,77 @@ Examples:
         '--interval',
         type=int,
         default=5,
-        help='Polling interval in seconds (default: 5)'
+        help='Polling interval in seconds when using the poll backend (default: 5)'
+    )
+
+    parser.add_argument(
+        '--backend',
+        choices=['auto', 'inotify', 'poll'],
+        default='auto',
+        help='How to detect changes: inotify file events, or polling (default: auto, inotify when available)'
+    )
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='Number of targets to update and install at once (default: all of them)'
+    )
+
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=1.0,
+        help='Seconds to wait for further changes before syncing a new version (default: 1)'
+    )
+
+    parser.add_argument(
+        '--link',
+        action='store_true',
+        help='Dev mode: skip publish and npm install, copy the built dist/ into each target\'s node_modules instead'
+    )
+
+    parser.add_argument(
+        '--history',
+        default=DEFAULT_HISTORY_PATH,
+        help=f'JSON-lines file each sync\'s stage timings are appended to (default: {DEFAULT_HISTORY_PATH})'
+    )
+
+    parser.add_argument(
+        '--report',
+        action='store_true',
+        help='Print p50/p95 timings per stage from the sync history and exit'
+    )
+
+    parser.add_argument(
+        '--last',
+        type=int,
+        default=None,
+        help='Only include the last N syncs in --report'
     )
 
     args = parser.parse_args()
 
+    if args.report:
+        print_report(Path(args.history), args.last)
+        return
+
+    if args.config:
+        daemon = WorkspaceDaemon(
+            config_path=args.config,
+            poll_interval=args.interval,
+            backend=args.backend,
+            jobs=args.jobs,
+            debounce=args.debounce,
+            link=args.link,
+            history_path=args.history
+        )
+        daemon.watch()
+        return
+
+    if not (args.watch and args.dependency and args.targets):
+        parser.error('--watch, --dependency and --targets are required unless --config or --report is given')
+
     # Token will be read from watch directory's .npmrc in __init__
     # Create and start watcher
     watcher = PackageWatcher(
@@ -328,7 +1321,12 @@ Examples:
         dependency_name=args.dependency,
         target_package_jsons=args.targets,
         npm_token=args.token,
-        poll_interval=args.interval
+        poll_interval=args.interval,
+        backend=args.backend,
+        jobs=args.jobs,
+        debounce=args.debounce,
+        link=args.link,
+        history_path=args.history
     )
 
     watcher.watch()